@@ -9,15 +9,14 @@ This is code for consolidation.
 """
 
 import argparse
-from human_social_network_generator import human_social_network_iterations, \
-    human_social_network
+from human_social_network_generator import human_social_network_iterations
 from numpy import random
-import csv
-import copy as C
-from MyNetworkFunctions import *
+import dsit_engine as dsit
+from graph_backend import set_column
+import instrumentation as prof
 
 debug_mode = False
-output_json_graphs = False
+output_graph_snapshots = False
 # Create the folder for storing the output files (if it doesn't exist)
 data_folder = "./data_consol_homo/"
 # pathlib.Path(data_folder).mkdir(exist_ok=True)
@@ -30,130 +29,18 @@ parser.add_argument('-e', '--extraversion', help='-1=negative skew, 0=approximat
 parser.add_argument('-c', '--conformity', help='-1=negative skew, 0=approximate normal, 1=positive skew',
                     required=(not debug_mode), default=0)
 parser.add_argument('-i', '--iterations', help='int - number of iterations', required=(not debug_mode), default=10)
+parser.add_argument('-w', '--ci_width', help='float - stop once the confidence interval of the mean 0:1 '
+                    'distribution is narrower, running at most -i iterations', default=None)
 parser.add_argument('-n', '--sim_num', help='int - number of simulation', required=(not debug_mode), default=-1)
 parser.add_argument('-p', '--power', help='float - power to raise learning to', required=(not debug_mode), default=-1)
-
-
-#############################################################################
-#### Helper functions #######################################################
-#############################################################################
-def shouldIChange(graph, nodeNum):
-    conformity = graph.node[nodeNum]['conformity']
-    myValue = graph.node[nodeNum]['value']
-    sameTally = 0
-    diffTally = 0
-
-    neighbors = graph.neighbors(nodeNum)
-    for n in neighbors:
-        if graph.node[n]['value'] == myValue:
-            sameTally = sameTally + 1
-        else:
-            diffTally = diffTally + 1
-
-    p = float(args.power)
-    prob_of_conforming = conformity * diffTally ** p / (sameTally ** p + diffTally ** p)
-    if (random.random() < prob_of_conforming):
-        return True
-    return False
-
-
-def simulate(graph, fileName, iterations=1):
-    random.seed()
-    graphSummaryDataFileName = fileName + '.csv'
-    f = open(graphSummaryDataFileName, 'w')
-    fields = ['iteration', 'gen', 'influenceMoveCount', '0:1 Distribution']
-    csvwr = csv.DictWriter(f, fieldnames=fields, delimiter=',')
-    csvwr.writeheader()
-
-    for i in range(0, iterations):
-        if debug_mode:
-            print("Iteration:" + str(i))
-        g = C.deepcopy(graph)
-        # Randomly pick individual and give opinion to friends until 50% reached.
-        # Note that since we pick all friends this value can exceed 50%
-        for node in g.nodes():
-            g.add_node(node, value=0)
-
-        counter = 0
-        nodes_50pc = len(g.nodes()) / 2
-        while counter < nodes_50pc:
-            node = random.choice(g.nodes())
-            if g.node[node]["value"] == 0:
-                g.add_node(node, value=1)
-                counter = counter + 1
-            friends = g.neighbors(node)
-            for friend in friends:
-                if g.node[friend]["value"] == 0:
-                    g.add_node(friend, value=1)
-                    counter = counter + 1
-                    if counter >= nodes_50pc:
-                        break
-
-        data = {}
-        data['iteration'] = i
-        data['gen'] = 0
-        data['influenceMoveCount'] = 0
-        # =======================================================================
-        # data['meanSimilar'] = meanSimilarityCoefficient(g)
-        # muthClump = muthukrishnaClumpiness(g)
-        # data['meanClumpSize'] = N.mean(muthClump)
-        # data['numClumps'] = len(muthClump)
-        # valComm = valueCommunities(g)
-        # data['meanCommunitySize'] = N.mean(map(len, valComm))
-        # data['numCommunities'] = len(valComm)
-        # data['influenceMoveCount'] = 0
-        # =======================================================================
-        zero_one = zeroToOne(g)
-        data['0:1 Distribution'] = zero_one
-        csvwr.writerow(data)
-        # Save graph
-        save_to_jsonfile(fileName + '_iter_' + str(i) + '_gen_' + str(0) + '.json', g)
-
-        # Select random node and apply social influence rules until nNodes generations of no change
-        nStayedSame = 0
-        count = 0
-        numNodes = len(g.nodes())
-        while (nStayedSame < 2 * numNodes):
-            if debug_mode:
-                print("Count:" + str(count))
-            count = count + 1
-            randNode = random.choice(g.nodes())
-            # calculate if value should change and change if necessary
-            if (shouldIChange(g, randNode)):
-                newValue = (g.node[randNode]['value'] + 1) % 2
-                g.add_node(randNode, value=newValue)
-                nStayedSame = 0
-            else:
-                nStayedSame = nStayedSame + 1
-
-                if count % numNodes == 0:
-                    # If you want to write every generation, indent this under the while loop.
-                    # Here I'm just outputting at the beginning and end to save space
-                    data = {}
-                    data['iteration'] = i
-                    data['gen'] = count / numNodes
-                    data['influenceMoveCount'] = count
-                    # ===================================================================
-                    # data['meanSimilar'] = meanSimilarityCoefficient(g)
-                    # muthClump = muthukrishnaClumpiness(g)
-                    # data['meanClumpSize'] = N.mean(muthClump)
-                    # data['numClumps'] = len(muthClump)
-
-                    # valComm = valueCommunities(g)
-                    # data['meanCommunitySize'] = N.mean(map(len, valComm))
-                    # data['numCommunities'] = len(valComm)
-                    # data['influenceMoveCount'] = count
-                    # ===================================================================
-                    data['0:1 Distribution'] = zeroToOne(g)
-                    csvwr.writerow(data)
-                    # Save graph
-                    if output_json_graphs and count % numNodes == 0:
-                        save_to_jsonfile(fileName + '_iter_' + str(i) + '_gen_' + str(count) + '.json', g)
-    f.close()
+parser.add_argument('--profile', help='print phase timings and counters at exit, or write them to the given .json file',
+                    nargs='?', const='-', default=None)
 
 
 if __name__ == '__main__':
     args = parser.parse_args()
+    if args.profile:
+        prof.enable(args.profile)
     Gs = []
     if debug_mode:
         print("Create network")
@@ -161,13 +48,17 @@ if __name__ == '__main__':
 
     if debug_mode:
         print("Assign conformity values")
-    for node in G.nodes():
-        G.add_node(node, conformity=random.beta(*beta_params[int(args.conformity)]))
+    set_column(G, 'conformity', random.beta(*beta_params[int(args.conformity)], size=len(G)))
     if debug_mode:
         print("Save iterations of the graph")
 
     if debug_mode:
         print("Run DSIT")
-    simulate(G,
-             data_folder + 'graph_ext_' + args.extraversion + '_conf_' + args.conformity + '_simnum_' + args.sim_num + '_power_' + args.power,
-             int(args.iterations))
+    dsit.simulate(G,
+                  data_folder + 'graph_ext_' + args.extraversion + '_conf_' + args.conformity + '_simnum_' + args.sim_num + '_power_' + args.power,
+                  dsit.homophilous_values(),
+                  update_rule=dsit.power_rule(float(args.power)),
+                  stopping_rules=[dsit.stability_window()],
+                  iterations=int(args.iterations),
+                  target_width=None if args.ci_width is None else float(args.ci_width), record_every=len(G),
+                  snapshot_start=True, snapshot_end=output_graph_snapshots, debug_mode=debug_mode)
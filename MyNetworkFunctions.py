@@ -1,17 +1,20 @@
-import json
-from networkx.readwrite import json_graph
+from graph_backend import as_backend
+from node_link_stream import read_node_link, write_node_link
 
 def save_to_jsonfile(filename, graph):
-    g = graph
-    g_json = json_graph.node_link_data(g)
-    json.dump(g_json, open(filename, 'w'))
+    """Writes graph as node-link JSON, streamed record by record (gzipped if filename ends in .gz)"""
+    write_node_link(filename, graph)
+
+def load_from_jsonfile(filename):
+    return read_node_link(filename)
     
 def zeroToOne(graph):
-    """Assumes binary values"""
+    """Assumes binary values. graph can be a networkx graph or any graph_backend."""
+    values = as_backend(graph).attribute('value')
     zeros = 0
     ones = 0
-    for n in graph.nodes():
-        if graph.node[n]['value'] == 0:
+    for value in values:
+        if value == 0:
             zeros = zeros + 1
         else:
             ones = ones + 1
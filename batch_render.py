@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Headless batch rendering of degree distribution plots and geodesic trajectories.
+
+Plots are drawn from stored data: degree histograms (counts[k] nodes of degree k, e.g. from the networks
+of a network_bank) and the geodesic column of the CSV files written by network_equilibrium. Rendering
+goes through the Agg canvas without pyplot, so no display or GUI backend is needed. Each process draws
+every plot into one reused figure, and render_sweep spreads the plots of a whole sweep over a process
+pool, writing each as <name>.png and/or <name>.svg.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+FORMATS = ('png', 'svg')
+
+parser = argparse.ArgumentParser(description="Render degree plots and geodesic trajectories of a sweep")
+parser.add_argument('-t', '--trajectories', help='folder of network_equilibrium CSV files', default='')
+parser.add_argument('-b', '--bank', help='network bank whose degree distributions are plotted', default='')
+parser.add_argument('-o', '--output', help='folder the plots are written to', default='graphs')
+parser.add_argument('-f', '--formats', help='comma separated formats, png and/or svg', default='png')
+parser.add_argument('-j', '--processes', help='int - worker processes, all cores by default', default=None)
+
+# Figure reused by every plot rendered in this process
+_figure = None
+
+
+def draw_degree_distribution(ax, counts):
+    """
+    Draws the degree distribution of a histogram on ax, the fraction of nodes against the degree with
+    both axes logarithmic, as degree_distribution_plot
+    """
+    counts = np.asarray(counts)
+    degrees = np.flatnonzero(counts)
+    ax.scatter(degrees, counts[degrees] / counts.sum(), s=10)
+
+    ax.set_title("Degree Distribution")
+    ax.set_ylabel("Fraction")
+    ax.set_yscale("log")
+    y_ticks = [1, 0.1, 0.01, 0.001, 0.0001]
+    ax.set_yticks(y_ticks)
+    ax.set_yticklabels(y_ticks)
+    ax.set_xlabel("Degree")
+    ax.set_xscale("log")
+    x_ticks = [3, 30, 300]
+    ax.set_xticks(x_ticks)
+    ax.set_xticklabels(x_ticks)
+
+
+def draw_geodesic_trajectory(ax, iterations, geodesics, target=3.4):
+    """Draws the average geodesic after each round of network_equilibrium on ax, with the target as a line"""
+    ax.scatter(iterations, geodesics, s=10)
+    ax.set_title("Geodesic Equilibrium")
+    ax.set_xlabel("# of Iterations")
+    ax.set_ylabel("Average Geodesic")
+    ax.axhline(target, c='black', lw=1)
+
+
+DRAWINGS = {'degree': draw_degree_distribution,
+            'geodesic': draw_geodesic_trajectory}
+
+
+def _reused_figure():
+    global _figure
+    if _figure is None:
+        _figure = Figure()
+        FigureCanvasAgg(_figure)
+    return _figure
+
+
+def render(path, kind, data, formats=('png',)):
+    """
+    Draws one plot and writes it to path plus the extension of each format. Returns the files written.
+
+    Parameters
+    ----------
+    path : str
+        Output file without extension. Its folder is created if needed.
+    kind : str
+        'degree' (data is (counts,)) or 'geodesic' (data is (iterations, geodesics))
+    data : tuple
+        Arguments of the drawing function of kind, see DRAWINGS
+    formats : sequence
+        Any of FORMATS
+    """
+    figure = _reused_figure()
+    figure.clear()
+    DRAWINGS[kind](figure.add_subplot(1, 1, 1), *data)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    files = []
+    for extension in formats:
+        figure.savefig(path + '.' + extension, format=extension)
+        files.append(path + '.' + extension)
+    return files
+
+
+def _render_job(task):
+    job, formats = task
+    return render(*job, formats=formats)
+
+
+def render_sweep(jobs, formats=('png',), processes=None):
+    """
+    Renders every (path, kind, data) job, see render, over a pool of processes (no pool if processes is
+    1) and returns the files written
+    """
+    tasks = [(job, tuple(formats)) for job in jobs]
+    if processes == 1 or len(tasks) < 2:
+        written = [_render_job(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            written = pool.map(_render_job, tasks, chunksize=max(1, len(tasks) // (4 * (processes or os.cpu_count()))))
+    return [path for files in written for path in files]
+
+
+def trajectory_jobs(folder, output):
+    """Returns a geodesic job for every CSV file written by network_equilibrium in folder"""
+    jobs = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith('.csv'):
+            continue
+        with open(os.path.join(folder, name), newline='') as f:
+            rows = list(csv.DictReader(f))
+        iterations = [int(row['iterations']) for row in rows]
+        geodesics = [float(row['geodesic']) for row in rows]
+        jobs.append((os.path.join(output, name[:-len('.csv')] + ' geodesic'), 'geodesic', (iterations, geodesics)))
+    return jobs
+
+
+def degree_jobs(bank, output):
+    """Returns a degree job for every network of a network bank, histogrammed from its stored CSR arrays"""
+    from network_bank import network_keys, read_network
+    jobs = []
+    for key in network_keys(bank):
+        counts = np.bincount(np.diff(np.asarray(read_network(bank, key).indptr)))
+        jobs.append((os.path.join(output, key + ' degrees'), 'degree', (counts,)))
+    return jobs
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    jobs = []
+    if args.trajectories:
+        jobs.extend(trajectory_jobs(args.trajectories, args.output))
+    if args.bank:
+        jobs.extend(degree_jobs(args.bank, args.output))
+    files = render_sweep(jobs, args.formats.split(','), None if args.processes is None else int(args.processes))
+    print("{0} files written to {1}".format(len(files), args.output))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the network generators, the prestige equilibrium, the DSIT engine and ks_test.
+
+Each benchmark is run at several grid sizes (n x n). Wall time and peak memory are recorded for every size
+and a scaling exponent (time ~ nodes ** exponent) is fitted over the sizes that ran. Results are written
+as JSON. Passing an earlier results file with -b flags every timing that got slower by more than the
+threshold, so runs can be compared against a stored baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+from numpy import random
+
+from human_social_network_generator34 import _run_sim, human_social_network_iterations
+from network_generator_prestige import equilibrium_round
+import network_data
+import dsit_engine as dsit
+from graph_backend import set_column
+
+parser = argparse.ArgumentParser(description="Time generators, prestige rounds, DSIT and ks_test over grid sizes")
+parser.add_argument('-s', '--sizes', help='comma separated grid sizes n (network is nxn)', default='10,20,30,50,100')
+parser.add_argument('-k', '--benchmarks', help='comma separated benchmarks to run, default all', default='')
+parser.add_argument('-o', '--output', help='file to write the results to', default='benchmark_results.json')
+parser.add_argument('-b', '--baseline', help='earlier results file to check for regressions', default='')
+parser.add_argument('-t', '--threshold', help='float - relative slowdown flagged as a regression', default=0.25)
+parser.add_argument('-r', '--repeats', help='int - timed runs per size, the fastest is kept', default=1)
+parser.add_argument('-m', '--budget', help='float - seconds; larger sizes are skipped once a run takes longer',
+                    default=120)
+parser.add_argument('--no-memory', help='skip the extra traced run used to measure peak memory',
+                    action='store_true')
+
+# Networks used as inputs, generated once per size and not timed
+_generated = {}
+
+
+def generated_network(n):
+    """Returns a generator network of size nxn with conformity values, as built by the simulation scripts"""
+    if n not in _generated:
+        random.seed(n)
+        G = human_social_network_iterations((n, n), 5, False, random.beta, 4, 4)
+        set_column(G, 'conformity', random.beta(4, 4, G.number_of_nodes()))
+        _generated[n] = G
+    return _generated[n]
+
+
+#############################################################################
+#### Benchmarks #############################################################
+#############################################################################
+# Each benchmark is called with the grid size n and returns the function to time. Everything done before
+# returning is setup and not timed.
+
+def bench_run_sim(n):
+    """Five movement sweeps of _run_sim"""
+    random.seed(0)
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(n, n, True))
+    set_column(G, 'extraversion', random.beta(4, 4, n * n))
+    locations = {i * n + j: (i, j) for i in range(n) for j in range(n)}
+
+    def run():
+        for sweep in range(5):
+            _run_sim(G, locations, (n, n))
+    return run
+
+
+def bench_generator(n):
+    """human_social_network_iterations with five movement iterations"""
+    def run():
+        human_social_network_iterations((n, n), 5, False, random.beta, 4, 4)
+    return run
+
+
+def bench_equilibrium_round(n):
+    """One round (one iteration per node) of the prestige birth-death process"""
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(n, n, True))
+    nodes = list(G.nodes)
+    initial_nbrs = {node: list(G[node]) for node in nodes}
+
+    def run():
+        equilibrium_round(G, nodes, initial_nbrs, 4, 0.5)
+    return run
+
+
+def bench_simulate(n):
+    """Two consolidation replicates of 20 picks per node each"""
+    net = dsit.network_arrays(generated_network(n))
+
+    def run():
+        with tempfile.TemporaryDirectory() as folder:
+            dsit.simulate(net, os.path.join(folder, 'bench'), dsit.random_values(), iterations=2,
+                          stopping_rules=[dsit.step_limit(20 * n * n)], seed=0)
+    return run
+
+
+def bench_ks_test(n):
+    """network_data.ks_test on a generator network"""
+    G = generated_network(n)
+
+    def run():
+        network_data.ks_test(G)
+    return run
+
+
+BENCHMARKS = {'run_sim': bench_run_sim,
+              'generator': bench_generator,
+              'equilibrium_round': bench_equilibrium_round,
+              'simulate': bench_simulate,
+              'ks_test': bench_ks_test}
+
+
+#############################################################################
+#### Harness ################################################################
+#############################################################################
+def measure(benchmark, n, repeats=1, memory=True):
+    """Returns (seconds, peak_bytes) of a benchmark at size n. peak_bytes is None without memory."""
+    seconds = float('inf')
+    for repeat in range(repeats):
+        run = benchmark(n)
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        # Separate run, tracing slows the timed code down too much to time it at the same time
+        run = benchmark(n)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def scaling_exponent(sizes, seconds):
+    """Least-squares slope of log(seconds) against log(nodes), or None with fewer than two sizes"""
+    if len(sizes) < 2:
+        return None
+    nodes = np.array(sizes, dtype=float) ** 2
+    return float(np.polyfit(np.log(nodes), np.log(seconds), 1)[0])
+
+
+def run_benchmarks(names, sizes, repeats=1, budget=120, memory=True):
+    """Runs the named benchmarks over the sizes and returns the results dict written to JSON"""
+    results = {}
+    for name in names:
+        entry = {'sizes': [], 'seconds': [], 'peak_bytes': [], 'skipped': []}
+        for n in sizes:
+            if entry['seconds'] and entry['seconds'][-1] > budget:
+                entry['skipped'].append(n)
+                continue
+            seconds, peak = measure(BENCHMARKS[name], n, repeats, memory)
+            entry['sizes'].append(n)
+            entry['seconds'].append(seconds)
+            entry['peak_bytes'].append(peak)
+            print("{0} {1}x{1}: {2:.4f}s".format(name, n, seconds) +
+                  ("" if peak is None else ", peak {0:.1f} MB".format(peak / 1e6)), file=sys.stderr)
+        entry['exponent'] = scaling_exponent(entry['sizes'], entry['seconds'])
+        results[name] = entry
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """Returns (name, size, old, new) for every timing more than threshold slower than in baseline"""
+    flagged = []
+    for name, entry in results.items():
+        if name not in baseline:
+            continue
+        old = dict(zip(baseline[name]['sizes'], baseline[name]['seconds']))
+        for n, seconds in zip(entry['sizes'], entry['seconds']):
+            if n in old and seconds > old[n] * (1 + threshold):
+                flagged.append((name, n, old[n], seconds))
+    return flagged
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.sizes.split(',')]
+    names = args.benchmarks.split(',') if args.benchmarks else list(BENCHMARKS)
+
+    results = run_benchmarks(names, sizes, int(args.repeats), float(args.budget), not args.no_memory)
+    with open(args.output, 'w') as f:
+        json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                   'networkx': nx.__version__, 'numpy': np.__version__, 'results': results}, f, indent=2)
+
+    for name, entry in results.items():
+        if entry['exponent'] is not None:
+            print("{0}: time ~ nodes^{1:.2f}".format(name, entry['exponent']))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        flagged = regressions(results, baseline, float(args.threshold))
+        for name, n, old, new in flagged:
+            print("REGRESSION {0} {1}x{1}: {2:.4f}s -> {3:.4f}s".format(name, n, old, new))
+        if flagged:
+            sys.exit(1)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Calibration of the generator settings to a target geodesic or clustering.
+
+Two knobs are searched. The number of migration iterations of human_social_network_iterations
+lowers the geodesic and raises clustering as it grows. The birth-death rate p of the prestige process
+does the opposite. Both are searched by bisection over pilot runs on ArrayGraph copies of the
+network, scored with sampled metrics: BFS from a sample of sources for the geodesic, and local
+clustering of a sample of nodes.
+
+Pilot results and calibrated settings are kept in a JSON table (calibration.json by default), keyed
+by everything except the target. A later run asking for the same setting gets it from the table, and
+a new target for a known setting reuses the pilots already run. Pilots are seeded by their number,
+so the table is reproducible. The generators draw from the random module, which a pilot reseeds and
+hands back in the state it found it.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+
+import networkx as nx
+import numpy as np
+
+from graph_backend import ArrayGraph
+from human_social_network_generator34 import _run_sim
+from network_generator_prestige import equilibrium_round
+
+DEFAULT_TABLE = 'calibration.json'
+METRICS = ('geodesic', 'clustering')
+
+parser = argparse.ArgumentParser(description="Calibrate migration iterations or birth-death rate to a target")
+parser.add_argument('knob', help='iterations (migration generator) or birth_death_rate (prestige process)',
+                    choices=['iterations', 'birth_death_rate'])
+parser.add_argument('target', help='float - target value of the metric')
+parser.add_argument('-m', '--metric', help='geodesic or clustering', choices=METRICS, default='geodesic')
+parser.add_argument('-n', '--size', help='int - network size is nxn', default=30)
+parser.add_argument('-e', '--extraversion', help='beta parameters of extraversion (iterations only)', default='4,4')
+parser.add_argument('-d', '--decay', help='float - distance decay strength (birth_death_rate only)', default=4)
+parser.add_argument('-r', '--rounds', help='int - prestige rounds per pilot (birth_death_rate only)', default=10)
+parser.add_argument('-p', '--pilots', help='int - pilot runs averaged per evaluation', default=3)
+parser.add_argument('-t', '--table', help='calibration table file', default=DEFAULT_TABLE)
+
+
+#############################################################################
+#### Sampled metrics ########################################################
+#############################################################################
+def sampled_geodesic(graph, sources):
+    """Mean shortest path length from the source nodes to all other nodes of a connected graph backend"""
+    num_nodes = graph.number_of_nodes()
+    total = 0.0
+    for source in sources:
+        distances = graph.distances(source)
+        total = total + (sum(distances.values()) if isinstance(distances, dict) else float(distances.sum()))
+    return total / (len(sources) * (num_nodes - 1))
+
+
+def sampled_clustering(graph, nodes):
+    """Mean local clustering coefficient of the inputted nodes of a graph backend"""
+    total = 0.0
+    for node in nodes:
+        nbrs = graph.neighbors(node)
+        k = len(nbrs)
+        if k < 2:
+            continue
+        nbr_set = set(nbrs)
+        links = sum(len(nbr_set.intersection(graph.neighbors(nbr))) for nbr in nbrs)
+        total = total + links / (k * (k - 1))
+    return total / len(nodes)
+
+
+def sampled_metrics(graph, rng, samples=32):
+    """Returns {'geodesic': ..., 'clustering': ...} from samples random sources / nodes"""
+    sample = rng.sample(range(graph.number_of_nodes()), min(samples, graph.number_of_nodes()))
+    return {'geodesic': sampled_geodesic(graph, sample), 'clustering': sampled_clustering(graph, sample)}
+
+
+#############################################################################
+#### Pilot runs #############################################################
+#############################################################################
+@contextlib.contextmanager
+def _seeded(seed):
+    """Seeds the random module for the duration of a pilot and restores its previous state after"""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+def _torus(n):
+    return ArrayGraph.from_graph(nx.convert_node_labels_to_integers(nx.grid_2d_graph(n, n, True)))
+
+
+def migration_curve(n, max_iterations, extraversion, seed, target=None, metric='geodesic'):
+    """
+    Runs one pilot of the migration generator on an nxn torus and returns the sampled metrics after
+    each iteration, starting with iteration 0. If target is given the pilot stops once metric has
+    passed it (geodesic below, clustering above).
+    """
+    rng = np.random.RandomState(seed)
+    graph = _torus(n)
+    graph.set_attribute('extraversion', rng.beta(*extraversion, size=n * n))
+    locations = {i * n + j: (i, j) for i in range(n) for j in range(n)}
+    with _seeded(seed):
+        curve = [sampled_metrics(graph, random)]
+        for i in range(max_iterations):
+            _run_sim(graph, locations, (n, n))
+            curve.append(sampled_metrics(graph, random))
+            if target is not None and _passed(curve[-1][metric], target, metric):
+                break
+    return curve
+
+
+def _passed(value, target, metric):
+    return value <= target if metric == 'geodesic' else value >= target
+
+
+def prestige_pilot(n, d, p, rounds, seed):
+    """Runs one pilot of the prestige birth-death process and returns its sampled metrics"""
+    graph = _torus(n)
+    nodes = list(graph.nodes())
+    initial_nbrs = {node: graph.neighbors(node) for node in nodes}
+    with _seeded(seed):
+        for i in range(rounds):
+            equilibrium_round(graph, nodes, initial_nbrs, d, p)
+        return sampled_metrics(graph, random)
+
+
+def bisect(evaluate, low, high, target, increasing, tolerance, max_steps=20):
+    """
+    Returns the setting in [low, high] whose evaluation is closest to target found by bisection, with
+    evaluate assumed monotone (increasing or decreasing). Integer bounds give an integer search,
+    which ends when the interval closes; float bounds stop once the interval is narrower than
+    tolerance or after max_steps.
+    """
+    integer = isinstance(low, int) and isinstance(high, int)
+    tried = {}
+
+    def score(x):
+        if x not in tried:
+            tried[x] = evaluate(x)
+        return tried[x]
+
+    for step in range(max_steps):
+        if (high - low <= 1) if integer else (high - low < tolerance):
+            break
+        middle = (low + high) // 2 if integer else (low + high) / 2
+        if (score(middle) < target) == increasing:
+            low = middle
+        else:
+            high = middle
+    candidates = [low, high] + list(tried)
+    return min(candidates, key=lambda x: abs(score(x) - target))
+
+
+#############################################################################
+#### Calibration table ######################################################
+#############################################################################
+def load_table(table=DEFAULT_TABLE):
+    """Returns the calibration table stored in table, or an empty one"""
+    if not os.path.isfile(table):
+        return {}
+    with open(table) as f:
+        return json.load(f)
+
+
+def save_table(data, table=DEFAULT_TABLE):
+    """Writes the calibration table, replacing the file in one step"""
+    staging = table + '.tmp'
+    with open(staging, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(staging, table)
+
+
+def _target_key(target):
+    return '{0:.4f}'.format(float(target))
+
+
+def calibrate_iterations(n, target, metric='geodesic', extraversion=(4, 4), pilots=3, max_iterations=200,
+                         table=DEFAULT_TABLE):
+    """
+    Returns the number of migration iterations of human_social_network_iterations((n, n), ...) whose
+    average metric is closest to target.
+
+    Parameters
+    ----------
+    n : int
+        Network size is nxn
+    target : float
+        Target geodesic or clustering
+    metric : str
+        'geodesic' or 'clustering'
+    extraversion : (float, float)
+        Beta parameters of extraversion
+    pilots : int
+        Pilot runs averaged per evaluation
+    max_iterations : int
+        Upper end of the search
+    table : str
+        Calibration table file, None to neither read nor store results
+
+    Notes
+    -----
+    Every pilot records the sampled metrics after each iteration, so one pass over the pilots gives
+    the whole averaged curve. The curve is stored in the table and the bisection runs over it.
+    """
+    key = 'iterations n={0} extraversion={1:g},{2:g}'.format(n, *extraversion)
+    data = load_table(table) if table else {}
+    entry = data.setdefault(key, {'curves': {}, 'calibrated': {}})
+    if _target_key(target) + ' ' + metric in entry['calibrated']:
+        return entry['calibrated'][_target_key(target) + ' ' + metric]
+
+    curves = entry['curves']
+    for pilot in range(pilots):
+        stored = curves.get(str(pilot))
+        if stored is None or (len(stored) <= max_iterations and not _passed(stored[-1][metric], target, metric)):
+            curves[str(pilot)] = migration_curve(n, max_iterations, extraversion, pilot, target, metric)
+    length = min(len(curves[str(pilot)]) for pilot in range(pilots))
+    mean = [np.mean([curves[str(pilot)][i][metric] for pilot in range(pilots)]) for i in range(length)]
+
+    iterations = bisect(lambda i: mean[i], 0, length - 1, target, metric == 'clustering', 1)
+    entry['calibrated'][_target_key(target) + ' ' + metric] = iterations
+    if table:
+        save_table(data, table)
+    return iterations
+
+
+def calibrate_birth_death(n, target, metric='geodesic', d=4, rounds=10, pilots=3, tolerance=0.01,
+                          table=DEFAULT_TABLE):
+    """
+    Returns the birth-death rate p of the prestige process whose average metric after rounds rounds
+    is closest to target.
+
+    Parameters
+    ----------
+    See calibrate_iterations. d is the distance decay strength and rounds the number of
+    equilibrium_round calls of each pilot. The search stops once the interval of p is narrower than
+    tolerance.
+    """
+    key = 'birth_death_rate n={0} d={1} rounds={2}'.format(n, d, rounds)
+    data = load_table(table) if table else {}
+    entry = data.setdefault(key, {'pilots': {}, 'calibrated': {}})
+    if _target_key(target) + ' ' + metric in entry['calibrated']:
+        return entry['calibrated'][_target_key(target) + ' ' + metric]
+
+    def evaluate(p):
+        runs = entry['pilots'].setdefault('{0:.6f}'.format(p), [])
+        while len(runs) < pilots:
+            runs.append(prestige_pilot(n, d, p, rounds, len(runs)))
+        if table:
+            save_table(data, table)
+        return np.mean([run[metric] for run in runs[:pilots]])
+
+    p = bisect(evaluate, 0.0, 1.0, target, metric == 'geodesic', tolerance)
+    entry['calibrated'][_target_key(target) + ' ' + metric] = p
+    if table:
+        save_table(data, table)
+    return p
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.knob == 'iterations':
+        extraversion = tuple(float(x) for x in args.extraversion.split(','))
+        value = calibrate_iterations(int(args.size), float(args.target), args.metric, extraversion,
+                                     int(args.pilots), table=args.table)
+    else:
+        value = calibrate_birth_death(int(args.size), float(args.target), args.metric, float(args.decay),
+                                      int(args.rounds), int(args.pilots), table=args.table)
+    print(value)
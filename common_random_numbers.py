@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Common-random-numbers sweep for comparing trait conditions.
+
+A condition is an (extraversion, conformity, disciples) triple, the first two indexing beta_params as the
+simulation scripts do. Running each condition from its own OS-entropy seed buries the difference between
+two conditions in between-run noise. Here every replicate instead draws one set of random numbers that
+all conditions share:
+
+    - the migration stream of the network generator, so conditions with the same extraversion get the
+      same network. The generator draws a move decision for each node and a destination only for the
+      nodes that move, from one stream, so once two extraversion skews disagree on a move the rest of
+      the stream is spent differently. Networks of different extraversion share a seed, not their
+      moves, so only same-extraversion conditions are coupled through the network
+    - the uniforms behind the traits, each trait being the beta quantile of its node's uniform, so a node
+      keeps its rank in extraversion and conformity whatever the skew
+    - the initial values and the pick sequence of the DSIT run, from separate streams, so a condition
+      drawing more disciples does not shift the picks
+
+Differences between conditions are then taken replicate by replicate. The output reports each condition
+against the baseline (the first condition): the mean paired difference of the final 0:1 distribution and
+gen, its confidence interval, and how much smaller the variance of the paired difference is than that of
+two independent runs.
+"""
+
+import argparse
+import csv
+import math
+import random
+
+import numpy as np
+
+import dsit_engine as dsit
+from graph_backend import set_column
+from human_social_network_generator34 import human_social_network_iterations
+from rng_streams import BlockStream
+
+beta_params = [[4, 4], [2.5, 3.5], [3.5, 2.5]]
+MODES = ('diffusion', 'consolidation')
+
+parser = argparse.ArgumentParser(description="Compare trait conditions with common random numbers")
+parser.add_argument('-c', '--conditions', help='semicolon separated extraversion,conformity,disciples triples, '
+                    'the first is the baseline', default='0,0,0;-1,0,0;1,0,0')
+parser.add_argument('-r', '--replicates', help='int - replicates per condition', default=20)
+parser.add_argument('-n', '--size', help='int - network size is nxn', default=30)
+parser.add_argument('-m', '--movement', help='int - movement iterations of the network generator', default=50)
+parser.add_argument('--mode', help='diffusion (Jesus and disciples) or consolidation (random start)',
+                    choices=MODES, default='diffusion')
+parser.add_argument('--seed', help='int - seed of the sweep', default=0)
+parser.add_argument('-o', '--output', help='CSV file of the paired differences', default='paired_differences.csv')
+
+
+def quantile_draw(uniforms):
+    """Returns a connect_dist for the network generator giving the beta quantiles of uniforms"""
+    from scipy import stats
+
+    def draw(a, b, size):
+        return stats.beta.ppf(uniforms[:size], a, b)
+    return draw
+
+
+def condition_network(grid, movement, extraversion, conformity, seed, uniforms):
+    """Returns the DSITNetwork of one condition of one replicate, see the module docstring"""
+    from scipy import stats
+    random.seed(seed)
+    G = human_social_network_iterations(grid, movement, False, quantile_draw(uniforms[0]),
+                                        *beta_params[extraversion])
+    set_column(G, 'conformity', stats.beta.ppf(uniforms[1][:len(G)], *beta_params[conformity]))
+    return dsit.network_arrays(G)
+
+
+def run_condition(net, disciples, seed, mode='diffusion'):
+    """Returns (final 0:1 distribution, gen) of one DSIT run of a replicate"""
+    conformity = np.asarray(net.conformity, dtype=float).tolist()
+    if mode == 'diffusion':
+        initializer = dsit.jesus_values(disciples)
+        stopping_rules = [dsit.stability_window(), dsit.conversion_threshold(0.5)]
+    else:
+        initializer = dsit.random_values()
+        stopping_rules = [dsit.stability_window()]
+    values = initializer(net, conformity, BlockStream([seed, 0]), 1)[0].tolist()
+    count = dsit.run_dsit(net, values, conformity, dsit.linear_rule, stopping_rules, BlockStream([seed, 1]))
+    return float(len(values) - sum(values)) / len(values), count
+
+
+def paired_sweep(conditions, replicates, grid=(30, 30), movement=50, mode='diffusion', seed=0):
+    """
+    Runs every condition for every replicate with common random numbers.
+
+    Parameters
+    ----------
+    conditions : list
+        (extraversion, conformity, disciples) triples
+    replicates : int
+        Replicates per condition
+    grid : (int, int)
+        Grid dimensions of the networks
+    movement : int
+        Movement iterations of human_social_network_iterations
+    mode : str
+        'diffusion' or 'consolidation', as the simulation scripts of that name
+    seed : int
+        Seed of the whole sweep, from which every replicate's seed is spawned
+
+    Returns
+    -------
+    Array of shape (conditions, replicates, 2) with the final 0:1 distribution and gen of each run
+    """
+    num_nodes = grid[0] * grid[1]
+    results = np.empty((len(conditions), replicates, 2))
+    for r, child in enumerate(np.random.SeedSequence(seed).spawn(replicates)):
+        replicate_seed = int(child.generate_state(1)[0])
+        uniforms = np.random.RandomState([replicate_seed, 2]).random_sample((2, num_nodes))
+        networks = {}
+        for j, (extraversion, conformity, disciples) in enumerate(conditions):
+            if (extraversion, conformity) not in networks:
+                networks[extraversion, conformity] = condition_network(grid, movement, extraversion, conformity,
+                                                                       replicate_seed, uniforms)
+            results[j, r] = run_condition(networks[extraversion, conformity], disciples, replicate_seed, mode)
+    return results
+
+
+def paired_differences(results, conditions, confidence=0.95):
+    """
+    Returns one row per condition other than the baseline (the first) and measure, with the mean paired
+    difference from the baseline, its confidence interval and the variance reduction over independent runs
+    """
+    from scipy import stats
+    replicates = results.shape[1]
+    t = stats.t.ppf((1 + confidence) / 2, replicates - 1)
+    rows = []
+    for j in range(1, len(conditions)):
+        for m, measure in enumerate(('distribution', 'gen')):
+            difference = results[j, :, m] - results[0, :, m]
+            paired = difference.var(ddof=1)
+            independent = results[j, :, m].var(ddof=1) + results[0, :, m].var(ddof=1)
+            rows.append({'baseline': ','.join(str(x) for x in conditions[0]),
+                         'condition': ','.join(str(x) for x in conditions[j]),
+                         'measure': measure, 'replicates': replicates,
+                         'mean_difference': difference.mean(),
+                         'ci': t * math.sqrt(paired / replicates),
+                         'paired_variance': paired, 'independent_variance': independent,
+                         'variance_reduction': independent / paired if paired > 0 else float('inf')})
+    return rows
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    conditions = [tuple(int(x) for x in condition.split(',')) for condition in args.conditions.split(';')]
+    results = paired_sweep(conditions, int(args.replicates), (int(args.size), int(args.size)), int(args.movement),
+                           args.mode, int(args.seed))
+    rows = paired_differences(results, conditions)
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Semi-parametric bootstrap goodness-of-fit p-values for the degree distribution fits of network_data.
+
+The KS distance of a law fitted to the same degrees it is compared with is smaller than that of the
+true law, so the asymptotic p-values of ks_test are too large. Following Clauset, Shalizi and Newman
+(2009), the p-value is instead the fraction of synthetic degree sequences, drawn from the fitted law
+and refitted the same way (x_min included), whose KS distance is at least the observed one. Each
+synthetic degree is drawn from the fitted law with probability n_tail / n and from the observed degrees
+below x_min otherwise.
+
+A batch of synthetic sequences is drawn as one (samples, n) array, turned into histograms with one
+bincount and refitted by the batched fits of network_data. Batches are spread over a process pool,
+each with its own seed spawned from one SeedSequence, and the bootstrap stops as soon as the Wilson
+interval of the p-value is within the requested precision.
+"""
+
+import argparse
+import multiprocessing
+
+import numpy as np
+import scipy.stats as stats
+
+import network_data
+
+MODELS = ('power_law', 'broken_power_law')
+
+parser = argparse.ArgumentParser(description="Bootstrap p-value of a degree distribution fit")
+parser.add_argument('network', help='node-link JSON file of the network, as written by save_to_jsonfile')
+parser.add_argument('-m', '--model', help='fitted law', choices=MODELS, default='power_law')
+parser.add_argument('-e', '--precision', help='float - half width of the interval of the p-value', default=0.01)
+parser.add_argument('-s', '--samples', help='int - largest number of synthetic sequences', default=2500)
+parser.add_argument('-b', '--batch', help='int - synthetic sequences fitted per batch', default=50)
+parser.add_argument('-j', '--processes', help='int - worker processes, all cores by default', default=None)
+parser.add_argument('--seed', help='int - seed of the synthetic sequences', default=None)
+
+
+def synthetic_degrees(rng, samples, n, pmf, body=None, tail_fraction=1.0):
+    """
+    Returns a (samples, n) array of degrees, each drawn from pmf (probabilities of k = 0..x_max) with
+    probability tail_fraction and uniformly from the degrees in body otherwise
+    """
+    cdf = np.cumsum(pmf)
+    cdf /= cdf[-1]
+    degrees = np.searchsorted(cdf, rng.random_sample((samples, n)), side='right')
+    if body is not None and len(body) and tail_fraction < 1:
+        from_body = rng.random_sample((samples, n)) >= tail_fraction
+        degrees[from_body] = body[rng.randint(len(body), size=int(from_body.sum()))]
+    return degrees
+
+
+def histograms(degrees, x_max):
+    """Returns the (samples, x_max + 1) degree histograms of the rows of degrees, in one bincount"""
+    samples = degrees.shape[0]
+    offsets = (np.arange(samples) * (x_max + 1))[:, None]
+    return np.bincount((degrees + offsets).ravel(), minlength=samples * (x_max + 1)).reshape(samples, x_max + 1)
+
+
+def _fit(model, counts):
+    """Returns (pmf parameters, ks) of the batched fit of model to the rows of counts"""
+    if model == 'power_law':
+        alpha, x_min, distance = network_data.fit_power_law_histograms(counts)
+        return (alpha, x_min), distance
+    alpha1, alpha2, switch, distance = network_data.fit_broken_power_law_histograms(counts)
+    return (alpha1, alpha2, switch), distance
+
+
+def _bootstrap_batch(task):
+    """Draws and refits one batch, returning the KS distances of its synthetic sequences"""
+    model, samples, n, x_max, pmf, body, tail_fraction, seed = task
+    rng = np.random.RandomState(np.random.MT19937(seed))
+    degrees = synthetic_degrees(rng, samples, n, pmf, body, tail_fraction)
+    return _fit(model, histograms(degrees, x_max))[1]
+
+
+def wilson_half_width(successes, trials, z):
+    """Half width of the Wilson score interval of a binomial proportion"""
+    p = successes / trials
+    return z / (1 + z * z / trials) * np.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+
+
+def bootstrap_p_value(degrees, model='power_law', precision=0.01, confidence=0.95, max_samples=2500,
+                      batch_size=50, processes=None, seed=None, x_max=None):
+    """
+    Returns the bootstrap goodness-of-fit p-value of a power law or broken power law fitted to a degree
+    sequence, see the module docstring.
+
+    Parameters
+    ----------
+    degrees : array
+        Degree of every node
+    model : str
+        'power_law' (fit_power_law, x_min selected) or 'broken_power_law' (fit_broken_power_law)
+    precision : float
+        The bootstrap stops once the half width of the confidence interval of p is at most precision
+    confidence : float
+        Confidence level of that interval
+    max_samples : int
+        Largest number of synthetic sequences. 2500 gives p to about 0.01 in the worst case.
+    batch_size : int
+        Synthetic sequences drawn and fitted as one array. Memory grows with batch_size * x_max.
+    processes : int
+        Worker processes, all cores if None and no pool if 1
+    seed : int
+        Seed of the synthetic sequences. A run is reproducible for a given seed and batch_size.
+    x_max : int
+        Upper end of the support of the fits and the synthetic sequences, n - 1 by default, see
+        network_data.degree_histogram
+
+    Returns
+    -------
+    (p, samples) with samples the number of synthetic sequences used
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    counts, x_max = network_data.degree_histogram(degrees, x_max)
+    params, observed = _fit(model, counts[None, :])
+    params = tuple(float(value[0]) for value in params)
+    observed = float(observed[0])
+
+    if model == 'power_law':
+        alpha, x_min = params
+        pmf = network_data.power_law_pmf(alpha, int(x_min), x_max)
+    else:
+        x_min = int(np.flatnonzero(counts[1:])[0]) + 1
+        pmf = network_data.broken_power_law_pmf(*params, x_min=x_min, x_max=x_max)
+    body = degrees[degrees < x_min]
+    tail_fraction = 1 - len(body) / len(degrees)
+
+    num_batches = -(-max_samples // batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(num_batches)
+    tasks = ((model, min(batch_size, max_samples - i * batch_size), len(degrees), x_max, pmf, body, tail_fraction,
+              seeds[i]) for i in range(num_batches))
+    z = stats.norm.ppf(0.5 + confidence / 2)
+
+    pool = None if processes == 1 else multiprocessing.Pool(processes)
+    exceeded = 0
+    samples = 0
+    try:
+        # In order, so that where the bootstrap stops does not depend on the scheduling
+        for distances in (pool.imap(_bootstrap_batch, tasks) if pool else map(_bootstrap_batch, tasks)):
+            exceeded += int((distances >= observed).sum())
+            samples += len(distances)
+            if wilson_half_width(exceeded, samples, z) <= precision:
+                break
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    return exceeded / samples, samples
+
+
+if __name__ == '__main__':
+    from MyNetworkFunctions import load_from_jsonfile
+    args = parser.parse_args()
+    G = load_from_jsonfile(args.network)
+    p, samples = bootstrap_p_value(network_data.degree_array(G), args.model, float(args.precision),
+                                   max_samples=int(args.samples), batch_size=int(args.batch),
+                                   processes=None if args.processes is None else int(args.processes),
+                                   seed=None if args.seed is None else int(args.seed))
+    print("p = {0:.4f} from {1} synthetic sequences".format(p, samples))
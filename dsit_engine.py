@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Shared Dynamic Social Impact Theory (DSIT) engine.
+
+The diffusion, consolidation, homophily, correlated and jconf simulation scripts only differ
+in how values are initialized, how the neighbour tallies are weighed and when a run stops.
+Those three pieces are pluggable here and every variant shares the same inner loop.
+"""
+
+import collections
+import csv
+
+import numpy as np
+from numpy import random
+from scipy import sparse
+
+from MyNetworkFunctions import save_to_jsonfile
+from flip_log import FlipLog
+from graph_backend import as_backend
+from graph_snapshots import SnapshotWriter, snapshot_graph
+import initial_conditions
+from opinion_metrics import opinion_structure
+from replicate_stats import ReplicateAggregator
+from rng_streams import BlockStream
+import instrumentation as prof
+
+# Compact view of a graph used by the inner loop. indptr/indices are the CSR adjacency, nodes maps
+# array positions back to the original node labels.
+DSITNetwork = collections.namedtuple('DSITNetwork', ['nodes', 'indptr', 'indices', 'extraversion',
+                                                     'conformity'])
+
+
+def network_arrays(graph):
+    """
+    Returns a DSITNetwork holding the CSR adjacency and the trait columns of the inputted graph.
+
+    Parameters
+    ----------
+    graph : Graph
+        Network with 'extraversion' and 'conformity' node attributes, a networkx graph or any
+        graph_backend
+
+    Notes
+    -----
+    Neighbour order is the order reported by the graph, so initializers that walk neighbours behave
+    exactly as they do on the graph itself.
+    """
+    graph = as_backend(graph)
+    nodes, indptr, indices = graph.csr()
+    return DSITNetwork(nodes, indptr, indices, graph.attribute('extraversion'), graph.attribute('conformity'))
+
+
+#############################################################################
+#### Initializers ###########################################################
+#############################################################################
+# An initializer is called as init(net, conformity, rng, replicates) and returns the starting values of
+# every replicate as an int8 array of shape (replicates, numNodes), see initial_conditions.
+# conformity is a copy shared by the replicates that the initializer may change (e.g. for Jesus).
+
+def random_values():
+    """Every node independently starts at 0 or 1 with equal probability (consolidation)."""
+    def init(net, conformity, rng, replicates=1):
+        return initial_conditions.random_batch(net, replicates, rng)
+    return init
+
+
+def homophilous_values(fraction=0.5):
+    """
+    Randomly pick individuals and give the opinion to all their friends until the fraction is reached.
+    Note that since all friends are picked this value can exceed the fraction by one.
+    """
+    def init(net, conformity, rng, replicates=1):
+        return initial_conditions.homophilous_batch(net, replicates, rng, fraction)
+    return init
+
+
+def jesus_values(disciples=0, jconf=0):
+    """
+    Everyone starts at 0 except the most extraverted person (Jesus), who holds value 1 with conformity
+    jconf, and up to the given number of disciples drawn from Jesus' friends (diffusion).
+    """
+    def init(net, conformity, rng, replicates=1):
+        jesus = initial_conditions.jesus_seed(net)
+        conformity[jesus] = jconf
+        return initial_conditions.disciples_batch(net, replicates, rng, jesus, disciples)
+    return init
+
+
+#############################################################################
+#### Update rules ###########################################################
+#############################################################################
+# An update rule weighs the tallies of same and different neighbours. The probability of
+# conforming is conformity * rule(sameTally, diffTally).
+
+def linear_rule(sameTally, diffTally):
+    """Original DSIT rule: the share of neighbours holding the other value."""
+    return diffTally / (sameTally + diffTally)
+
+
+def power_rule(p):
+    """
+    Non-linear learning, where both tallies are raised to the power p before weighing.
+
+    A node none of whose neighbours holds the other value has nothing to conform to and never changes,
+    whatever p. The formula alone would make such a node change with its full conformity for p < 0 (the
+    original scripts raised ZeroDivisionError there), so runs with p < 0 would never become stable. Even
+    so, for p < 0 nodes with mixed neighbourhoods lean towards the minority and a run need not settle;
+    bound such runs with step_limit.
+    """
+    def rule(sameTally, diffTally):
+        if diffTally == 0:
+            return 0.0
+        if sameTally == 0:
+            # Limit of the formula as sameTally goes to 0
+            return 0.5 if p == 0 else float(p > 0)
+        return diffTally ** p / (sameTally ** p + diffTally ** p)
+    return rule
+
+
+def tally_table(update_rule, max_degree):
+    """
+    Returns the update rule precomputed for every pair of tallies a node of at most max_degree can see.
+
+    Parameters
+    ----------
+    update_rule : function
+        See linear_rule and power_rule
+    max_degree : int
+        Largest degree in the network
+
+    Notes
+    -----
+    Entry [sameTally, diffTally] holds update_rule(sameTally, diffTally). Entry [0, 0] is 0, so isolated
+    nodes never change. Both tallies are bounded by the degree, so the table is built once per run
+    and every engine looks the weight up instead of evaluating the rule (and its float powers) per pick.
+    """
+    table = np.zeros((max_degree + 1, max_degree + 1))
+    for sameTally in range(max_degree + 1):
+        for diffTally in range(max_degree + 1 - sameTally):
+            if sameTally + diffTally > 0:
+                table[sameTally, diffTally] = update_rule(sameTally, diffTally)
+    return table
+
+
+#############################################################################
+#### Stopping rules #########################################################
+#############################################################################
+# A stopping rule is called as stop(nStayedSame, zeros, numNodes, count) before every pick and returns
+# True once the run should end. count is the number of picks made so far.
+
+def stability_window(factor=2):
+    """Stop after factor * numNodes consecutive picks without any change."""
+    def stop(nStayedSame, zeros, numNodes, count):
+        return nStayedSame >= factor * numNodes
+    return stop
+
+
+def conversion_threshold(threshold=0.5):
+    """Stop once the share of 0s (the 0:1 distribution) falls to the threshold."""
+    def stop(nStayedSame, zeros, numNodes, count):
+        return float(zeros) / numNodes <= threshold
+    return stop
+
+
+def step_limit(limit):
+    """Stop after limit picks (node evaluations in the synchronous schedule), e.g. to bound runs that never settle."""
+    def stop(nStayedSame, zeros, numNodes, count):
+        return count >= limit
+    return stop
+
+
+#############################################################################
+#### Engine #################################################################
+#############################################################################
+def run_dsit(net, values, conformity, update_rule=linear_rule, stopping_rules=None, rng=random,
+             on_step=None, table=None, flip_log=None):
+    """
+    Runs random-sequential social influence on values in place and returns the number of picks made.
+
+    Parameters
+    ----------
+    net : DSITNetwork
+        Network to run on
+    values : list
+        Starting value (0 or 1) of every node. Updated in place.
+    conformity : list
+        Conformity of every node
+    update_rule : function
+        Weighs (sameTally, diffTally) into the tally part of the probability of conforming
+    stopping_rules : list
+        The run ends as soon as any of these returns True. Defaults to a stability window of 2 * numNodes.
+    rng : RandomState or BlockStream
+        Source of randomness, numpy.random by default. A BlockStream (see rng_streams) makes the two
+        scalar draws per pick much cheaper.
+    on_step : function
+        Optional callback on_step(count, zeros) after every pick
+    table : ndarray
+        Precomputed tally_table of update_rule. Built here if not given.
+    flip_log : FlipLog
+        Optional log that every change is appended to as a (count, node, new_value) event. Its steps
+        is set to the final count, so quiet picks after the last flip are part of the recorded run.
+
+    Notes
+    -----
+    Each node keeps a running count of neighbours holding value 1, updated only when a neighbour flips.
+    A pick therefore costs O(1) instead of a walk over the neighbourhood, and the 0:1 distribution
+    is kept up to date without scanning every node.
+    """
+    if stopping_rules is None:
+        stopping_rules = [stability_window()]
+    numNodes = len(values)
+    # Plain lists are much faster than NumPy arrays for scalar access in the loop below
+    indptr = np.asarray(net.indptr).tolist()
+    indices = np.asarray(net.indices).tolist()
+    adjacency = [indices[indptr[n]:indptr[n + 1]] for n in range(numNodes)]
+    degree = [len(nbrs) for nbrs in adjacency]
+    ones_around = [sum(values[nbr] for nbr in nbrs) for nbrs in adjacency]
+    zeros = numNodes - sum(values)
+    if table is None:
+        table = tally_table(update_rule, max(degree))
+    weights = table.tolist()
+
+    nStayedSame = 0
+    count = 0
+    flips = 0
+    while not any(stop(nStayedSame, zeros, numNodes, count) for stop in stopping_rules):
+        count = count + 1
+        node = rng.randint(numNodes)
+        # calculate if value should change and change if necessary
+        myValue = values[node]
+        diffTally = ones_around[node] if myValue == 0 else degree[node] - ones_around[node]
+        sameTally = degree[node] - diffTally
+        prob_of_conforming = conformity[node] * weights[sameTally][diffTally]
+        if rng.random_sample() < prob_of_conforming:
+            values[node] = 1 - myValue
+            step = 1 if myValue == 0 else -1
+            zeros = zeros - step
+            for nbr in adjacency[node]:
+                ones_around[nbr] = ones_around[nbr] + step
+            if flip_log is not None:
+                flip_log.record(count, node, 1 - myValue)
+            flips = flips + 1
+            nStayedSame = 0
+        else:
+            nStayedSame = nStayedSame + 1
+        if on_step is not None:
+            on_step(count, zeros)
+
+    if flip_log is not None:
+        flip_log.steps = count
+    prof.count('random_picks', 2 * count)
+    prof.count('flips', flips)
+    return count
+
+
+def adjacency_matrix(net):
+    """Returns the adjacency of a DSITNetwork as a scipy CSR matrix without copying the structure again."""
+    numNodes = len(net.nodes)
+    indices = np.asarray(net.indices, dtype=np.int32)
+    return sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices,
+                              np.asarray(net.indptr, dtype=np.int32)), shape=(numNodes, numNodes))
+
+
+def run_dsit_synchronous(net, values, conformity, update_rule=linear_rule, stopping_rules=None, rng=random,
+                         on_step=None, table=None, flip_log=None):
+    """
+    Runs synchronous social influence, where every node evaluates whether to change at the same time in
+    each generation. Values are updated in place and the number of node evaluations is returned.
+
+    Parameters
+    ----------
+    See run_dsit. on_step is called after every generation, with the count in node evaluations
+    (generations * numNodes) so that it lines up with the random-sequential schedule, and values is
+    brought up to date before each call.
+
+    Notes
+    -----
+    The tallies of all nodes come from one sparse product A @ values, and all changes from one vectorized
+    Bernoulli draw against the looked up tally table. A generation without any change adds numNodes to
+    nStayedSame, so stability_window(2) ends the run after two unchanged generations.
+    """
+    if stopping_rules is None:
+        stopping_rules = [stability_window()]
+    numNodes = len(values)
+    A = adjacency_matrix(net)
+    degree = np.diff(A.indptr)
+    if table is None:
+        table = tally_table(update_rule, int(degree.max()))
+    conformity = np.asarray(conformity, dtype=float)
+    state = np.array(values, dtype=np.int32)
+    zeros = numNodes - int(state.sum())
+
+    nStayedSame = 0
+    count = 0
+    flips = 0
+    while not any(stop(nStayedSame, zeros, numNodes, count) for stop in stopping_rules):
+        count = count + numNodes
+        ones_around = A @ state
+        diffTally = np.where(state == 0, ones_around, degree - ones_around)
+        prob_of_conforming = conformity * table[degree - diffTally, diffTally]
+        changed = rng.random_sample(numNodes) < prob_of_conforming
+        if changed.any():
+            state[changed] = 1 - state[changed]
+            flips = flips + int(changed.sum())
+            zeros = numNodes - int(state.sum())
+            if flip_log is not None:
+                flip_log.record_many(count, np.flatnonzero(changed), state[changed])
+            if on_step is not None:
+                values[:] = state.tolist() if isinstance(values, list) else state
+            nStayedSame = 0
+        else:
+            nStayedSame = nStayedSame + numNodes
+        if on_step is not None:
+            on_step(count, zeros)
+
+    values[:] = state.tolist() if isinstance(values, list) else state
+    if flip_log is not None:
+        flip_log.steps = count
+    prof.count('random_picks', count)
+    prof.count('flips', flips)
+    return count
+
+
+def simulate(graph, fileName, initializer, update_rule=linear_rule, stopping_rules=None, iterations=1,
+             record_every=0, snapshot_start=False, snapshot_end=False, debug_mode=False, synchronous=False,
+             record_flips=False, snapshot_json=False, metrics=False, seed=None, target_width=None, confidence=0.95,
+             min_replicates=5, buffered=False):
+    """
+    Runs replicates of a DSIT simulation and writes the 0:1 distribution of each one to fileName.csv
+
+    Parameters
+    ----------
+    graph : Graph, graph_backend or DSITNetwork
+        Network with 'extraversion' and 'conformity' node attributes, or its arrays (e.g. from
+        SharedNetwork.network()), which are then used as they are
+    fileName : str
+        Output path without extension
+    initializer : function
+        Sets the starting values, see random_values, homophilous_values and jesus_values
+    update_rule : function
+        See linear_rule and power_rule
+    stopping_rules : list
+        See stability_window and conversion_threshold
+    iterations : int
+        Number of replicates
+    record_every : int
+        If 0 a row is written at the beginning and end of each replicate. Otherwise a row is
+        written every record_every picks, with gen counted in units of record_every.
+    snapshot_start, snapshot_end : bool
+        Whether to snapshot the values at the beginning / end of each replicate.
+        With record_every, snapshot_end takes a snapshot at every recorded row instead.
+        Snapshots go to the binary store fileName_network.npz / fileName_snapshots.bin
+        (see graph_snapshots, snapshots_to_json converts them back to node-link JSON).
+    debug_mode : bool
+        Print progress
+    synchronous : bool
+        If True every node updates at once in each generation (run_dsit_synchronous) instead of one
+        random node per pick
+    record_flips : bool
+        If True every change of each replicate is kept in a FlipLog and written to
+        fileName_iter_<i>_flips.npz, from which the full trajectory can be rebuilt
+    snapshot_json : bool
+        Write each snapshot directly as fileName_iter_<i>_gen_<gen>.json in node-link format instead
+    metrics : bool
+        If True every row also holds the opinion-structure metrics (meanSimilar, meanClumpSize, numClumps),
+        see opinion_metrics
+    seed : int
+        Seed of the run's random stream. By default it is seeded from OS entropy.
+    buffered : bool
+        If True the stream is a block-buffered rng_streams.BlockStream instead of a RandomState. It is as
+        reproducible from seed, but gives different values than the RandomState of the same seed.
+    target_width, confidence, min_replicates
+        If target_width is given, iterations is the largest number of replicates. Running statistics of
+        the final 0:1 distribution and gen of the replicates are kept (see replicate_stats) and no more
+        replicates are started once the confidence interval of the mean 0:1 distribution is narrower
+        than target_width, after at least min_replicates. The statistics are written to
+        fileName_summary.csv.
+
+    Returns
+    -------
+    The ReplicateAggregator with the statistics if target_width is given, otherwise None
+    """
+    rng = BlockStream(seed) if buffered else random.RandomState(seed)
+    net = graph if isinstance(graph, DSITNetwork) else network_arrays(graph)
+    graphSummaryDataFileName = fileName + '.csv'
+    f = open(graphSummaryDataFileName, 'w')
+    fields = ['iteration', 'gen', 'influenceMoveCount', '0:1 Distribution']
+    if metrics:
+        fields = fields + ['meanSimilar', 'meanClumpSize', 'numClumps']
+    csvwr = csv.DictWriter(f, fieldnames=fields, delimiter=',')
+    csvwr.writeheader()
+    numNodes = len(net.nodes)
+    table = tally_table(update_rule, max(net.indptr[n + 1] - net.indptr[n] for n in range(numNodes)))
+    conformity = np.asarray(net.conformity, dtype=float).tolist()
+    starts = initializer(net, conformity, rng, iterations)
+    aggregate = ReplicateAggregator(target_width, confidence, min_replicates) if target_width else None
+    snapshots = None
+    if (snapshot_start or snapshot_end) and not snapshot_json:
+        snapshots = SnapshotWriter(fileName, net)
+
+    def save_snapshot(i, gen, values, conformity):
+        with prof.timer('io'):
+            if snapshot_json:
+                save_to_jsonfile(fileName + '_iter_' + str(i) + '_gen_' + str(gen) + '.json',
+                                 snapshot_graph(net, values, conformity))
+            else:
+                snapshots.write(i, gen, values, conformity)
+
+    def distribution(values):
+        return float(numNodes - sum(values)) / numNodes
+
+    def write_row(i, gen, count, values):
+        data = {}
+        data['iteration'] = i
+        data['gen'] = gen
+        data['influenceMoveCount'] = count
+        data['0:1 Distribution'] = distribution(values)
+        if metrics:
+            with prof.timer('metrics'):
+                data.update(opinion_structure(net, values))
+        with prof.timer('io'):
+            csvwr.writerow(data)
+
+    for i in range(0, iterations):
+        if debug_mode:
+            print("Iteration:" + str(i))
+        values = starts[i].tolist()
+
+        write_row(i, 0, 0, values)
+        if snapshot_start:
+            save_snapshot(i, 0, values, conformity)
+
+        on_step = None
+        if record_every:
+            def on_step(count, zeros):
+                if count % record_every == 0:
+                    write_row(i, count / record_every, count, values)
+                    if snapshot_end:
+                        save_snapshot(i, count, values, conformity)
+
+        flip_log = FlipLog(values) if record_flips else None
+        run = run_dsit_synchronous if synchronous else run_dsit
+        with prof.timer('dsit'):
+            count = run(net, values, conformity, update_rule, stopping_rules, rng, on_step, table, flip_log)
+        if record_flips:
+            with prof.timer('io'):
+                flip_log.save(fileName + '_iter_' + str(i) + '_flips.npz')
+
+        if not record_every:
+            # Here only the beginning and end are written to save space
+            write_row(i, count, count, values)
+            if snapshot_end:
+                save_snapshot(i, count, values, conformity)
+
+        if aggregate is not None:
+            aggregate.add(distribution(values), count / record_every if record_every else count)
+            if aggregate.done():
+                if debug_mode:
+                    print("Stopped after {0} replicates".format(i + 1))
+                break
+    f.close()
+    if snapshots is not None:
+        snapshots.close()
+    if aggregate is not None:
+        with prof.timer('io'):
+            aggregate.write(fileName + '_summary.csv')
+    return aggregate
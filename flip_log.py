@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compact record of every value change in a DSIT run.
+
+Instead of writing a CSV row or a JSON graph per step, each flip is kept as a (step, node, new_value)
+event in a preallocated int32 buffer and written out in bulk together with the starting values.
+Any intermediate state, and the 0:1 distribution at every step, can be rebuilt from the two.
+"""
+
+import numpy as np
+
+
+class FlipLog:
+    """
+    Growable int32 buffer of (step, node, new_value) events.
+
+    Parameters
+    ----------
+    initial : list
+        Starting value (0 or 1) of every node
+    capacity : int
+        Number of events preallocated. The buffer doubles when full.
+    """
+
+    def __init__(self, initial, capacity=4096):
+        self.initial = np.array(initial, dtype=np.int8)
+        self.events = np.empty((capacity, 3), dtype=np.int32)
+        self.size = 0
+        # Length of the run, stored by the engine when it ends, and never less than the last flip
+        self.steps = 0
+
+    def _reserve(self, extra):
+        if self.size + extra > len(self.events):
+            grown = np.empty((max(2 * len(self.events), self.size + extra), 3), dtype=np.int32)
+            grown[:self.size] = self.events[:self.size]
+            self.events = grown
+
+    def record(self, step, node, new_value):
+        """Appends one flip, made at the given step. Called by run_dsit for every change."""
+        self._reserve(1)
+        self.events[self.size] = (step, node, new_value)
+        self.size = self.size + 1
+        self.steps = step
+
+    def record_many(self, step, nodes, new_values):
+        """Appends all flips of one synchronous generation. Called by run_dsit_synchronous."""
+        n = len(nodes)
+        self._reserve(n)
+        block = self.events[self.size:self.size + n]
+        block[:, 0] = step
+        block[:, 1] = nodes
+        block[:, 2] = new_values
+        self.size = self.size + n
+        self.steps = step
+
+    def save(self, filename):
+        """Writes the starting values and all events to a .npz file"""
+        np.savez_compressed(filename, initial=self.initial, events=self.events[:self.size],
+                            steps=np.int64(self.steps))
+
+    @classmethod
+    def load(cls, filename):
+        """Reads a FlipLog written by save"""
+        with np.load(filename) as data:
+            log = cls(data['initial'], capacity=max(len(data['events']), 1))
+            log.events[:len(data['events'])] = data['events']
+            log.size = len(data['events'])
+            log.steps = int(data['steps'])
+        return log
+
+    def state_at(self, step):
+        """Returns the values of every node after the given step"""
+        events = self.events[:self.size]
+        upto = np.searchsorted(events[:, 0], step, side='right')
+        state = self.initial.copy()
+        # Later events overwrite earlier ones, which is exactly the replay order
+        state[events[:upto, 1]] = events[:upto, 2]
+        return state
+
+    def zero_to_one(self):
+        """
+        Returns (steps, distribution) where distribution[k] is the share of 0s from steps[k] until the next
+        entry. The first entry is step 0 and the starting distribution.
+
+        Notes
+        -----
+        Every event is a genuine flip, so each one moves the number of 0s by exactly one.
+        """
+        events = self.events[:self.size]
+        num_nodes = len(self.initial)
+        zeros = num_nodes - int(self.initial.sum())
+        change = np.where(events[:, 2] == 0, 1, -1)
+        counts = zeros + np.concatenate(([0], np.cumsum(change)))
+        steps = np.concatenate(([0], events[:, 0]))
+        # Keep only the last entry of each step (synchronous generations flip many nodes per step)
+        last = np.append(steps[1:] != steps[:-1], True)
+        return steps[last], counts[last] / float(num_nodes)
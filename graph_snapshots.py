@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Binary graph-state snapshots for DSIT runs.
+
+The topology and static traits of a network are written once to <base>_network.npz. Every snapshot
+then only adds one record to <base>_snapshots.bin holding the iteration, the generation and the
+bit-packed value of every node (plus any conformity that the initializer changed, e.g. for Jesus).
+snapshots_to_json converts a store back to the node-link JSON files written by save_to_jsonfile.
+
+Integer node labels are stored as an array. Any other labels (strings, the (row, column) tuples of
+grid graphs) are stored as JSON text, see encode_nodes, and come back with tuples as tuples.
+"""
+
+import json
+import struct
+
+import networkx as nx
+import numpy as np
+
+from MyNetworkFunctions import save_to_jsonfile
+
+# iteration, gen, number of conformity overrides
+_RECORD_HEADER = struct.Struct('<iqi')
+
+
+def _json_label(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise ValueError("Node label {0!r} cannot be stored, labels must be numbers, strings or tuples of "
+                     "them".format(value))
+
+
+def encode_nodes(nodes):
+    """Returns node labels as JSON text, raising ValueError for labels JSON cannot hold"""
+    return json.dumps(list(nodes), default=_json_label)
+
+
+def _node_label(value):
+    """Tuples come back from JSON as lists, turn them into tuples again"""
+    return tuple(_node_label(x) for x in value) if isinstance(value, list) else value
+
+
+def decode_nodes(text):
+    """Returns the node labels of JSON text written by encode_nodes"""
+    return [_node_label(node) for node in json.loads(text)]
+
+
+def _integer_labels(nodes):
+    return all(isinstance(node, (int, np.integer)) and not isinstance(node, bool) for node in nodes)
+
+
+def save_network(filename, net):
+    """Writes the CSR topology, node labels and traits of a DSITNetwork to a .npz file"""
+    nodes = list(net.nodes)
+    if _integer_labels(nodes):
+        labels = {'nodes': np.asarray(nodes, dtype=np.int64)}
+    else:
+        labels = {'node_labels': np.array(encode_nodes(nodes))}
+    np.savez(filename, indptr=np.asarray(net.indptr, dtype=np.int64),
+             indices=np.asarray(net.indices, dtype=np.int32),
+             extraversion=np.asarray(net.extraversion, dtype=float),
+             conformity=np.asarray(net.conformity, dtype=float), **labels)
+
+
+def load_network(filename):
+    """Reads a DSITNetwork written by save_network"""
+    from dsit_engine import DSITNetwork
+    with np.load(filename) as data:
+        if 'node_labels' in data:
+            nodes = decode_nodes(str(data['node_labels']))
+        else:
+            nodes = data['nodes'].tolist()
+        return DSITNetwork(nodes, data['indptr'], data['indices'], data['extraversion'], data['conformity'])
+
+
+class SnapshotWriter:
+    """
+    Appends bit-packed value snapshots of one network to <base>_snapshots.bin
+
+    Parameters
+    ----------
+    base : str
+        Path prefix of the store
+    net : DSITNetwork
+        Network the snapshots belong to. Its topology and traits are written to <base>_network.npz.
+    """
+
+    def __init__(self, base, net):
+        save_network(base + '_network.npz', net)
+        self.conformity = np.asarray(net.conformity, dtype=float)
+        self.file = open(base + '_snapshots.bin', 'wb')
+
+    def write(self, iteration, gen, values, conformity=None):
+        """Adds the values (and any conformity differing from the network's) of one snapshot"""
+        overrides = np.empty(0, dtype=np.int32)
+        if conformity is not None:
+            conformity = np.asarray(conformity, dtype=float)
+            overrides = np.flatnonzero(conformity != self.conformity).astype(np.int32)
+        self.file.write(_RECORD_HEADER.pack(iteration, gen, len(overrides)))
+        self.file.write(np.packbits(np.asarray(values, dtype=np.uint8)).tobytes())
+        self.file.write(overrides.tobytes())
+        if len(overrides):
+            self.file.write(conformity[overrides].tobytes())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshots(base):
+    """
+    Returns the network of a store and a generator of (iteration, gen, values, conformity) for every
+    snapshot in it, in the order they were written.
+    """
+    net = load_network(base + '_network.npz')
+    num_nodes = len(net.nodes)
+    packed_size = (num_nodes + 7) // 8
+
+    def snapshots():
+        with open(base + '_snapshots.bin', 'rb') as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if not header:
+                    return
+                iteration, gen, num_overrides = _RECORD_HEADER.unpack(header)
+                packed = np.frombuffer(f.read(packed_size), dtype=np.uint8)
+                values = np.unpackbits(packed, count=num_nodes)
+                conformity = net.conformity.copy()
+                if num_overrides:
+                    overrides = np.frombuffer(f.read(4 * num_overrides), dtype=np.int32)
+                    conformity[overrides] = np.frombuffer(f.read(8 * num_overrides), dtype=float)
+                yield iteration, gen, values, conformity
+
+    return net, snapshots()
+
+
+def snapshot_graph(net, values, conformity):
+    """Returns a networkx graph of the network with the values and conformity of one snapshot"""
+    g = nx.Graph()
+    for i, node in enumerate(net.nodes):
+        g.add_node(node, extraversion=float(net.extraversion[i]), conformity=float(conformity[i]),
+                   value=int(values[i]))
+    for i, node in enumerate(net.nodes):
+        for j in net.indices[net.indptr[i]:net.indptr[i + 1]]:
+            if i < j:
+                g.add_edge(node, net.nodes[j])
+    return g
+
+
+def snapshots_to_json(base, fileName=None):
+    """
+    Converts every snapshot of a store to fileName_iter_<i>_gen_<gen>.json in node-link format, the files
+    the simulation scripts used to write directly. fileName defaults to base.
+    """
+    if fileName is None:
+        fileName = base
+    net, snapshots = read_snapshots(base)
+    for iteration, gen, values, conformity in snapshots:
+        save_to_jsonfile(fileName + '_iter_' + str(iteration) + '_gen_' + str(gen) + '.json',
+                         snapshot_graph(net, values, conformity))
@@ -7,9 +7,11 @@ Changed to handle networkx1.9.1 on the Harvard server
 """
 
 import networkx as nx
-from scipy import stats
+import numpy as np
 import random
 import subprocess
+import instrumentation as prof
+from graph_backend import as_backend, average_shortest_path_length, set_column
 
 
 def _migrate(location, grid, torus):
@@ -54,21 +56,32 @@ def _migrate(location, grid, torus):
 def _run_sim(G, locations, grid):
     """
     Gives each person the opportunity to move based on extraversion probability
+
+    G can be a networkx graph or any graph_backend, with nodes labelled 0..n-1. It is changed in place
+    and returned.
     """
+    graph = as_backend(G)
     overlaps = {}
-    for person in range(0, len(G.nodes())):
-        if random.random() < nx.get_node_attributes(G, 'extraversion')[person]:
-            current_location = locations[person]
-            new_location = _migrate(current_location, grid, True)
-            if new_location in overlaps:
-                for friend in overlaps[new_location]:
-                    G.add_edge(person, friend)
-                temp_location_list = overlaps[new_location]
-                temp_location_list.append(person)
-                overlaps[new_location] = temp_location_list
-            else:
-                overlaps[new_location] = [person]
-            locations[person] = new_location
+    moves = 0
+    edges = graph.number_of_edges()
+    extraversion = graph.attribute('extraversion').tolist()
+    with prof.timer('migration'):
+        for person in range(0, graph.number_of_nodes()):
+            if random.random() < extraversion[person]:
+                moves = moves + 1
+                current_location = locations[person]
+                new_location = _migrate(current_location, grid, True)
+                if new_location in overlaps:
+                    for friend in overlaps[new_location]:
+                        graph.add_edge(person, friend)
+                    temp_location_list = overlaps[new_location]
+                    temp_location_list.append(person)
+                    overlaps[new_location] = temp_location_list
+                else:
+                    overlaps[new_location] = [person]
+                locations[person] = new_location
+    prof.count('random_picks', len(locations) + 2 * moves)
+    prof.count('edges_added', graph.number_of_edges() - edges)
 
     return (G, locations)
 
@@ -88,6 +101,7 @@ def human_social_network(grid, geodesic, connect_dist, *args):
         This will be treated as an upper bound.
     connect_dist : function
         Distribution function from which to draw probability of connection / migration values.
+        Called once as connect_dist(*args, size=number of nodes), e.g. numpy.random.beta.
     args : arguments
         Arguments needed for the probability distribution
 
@@ -115,16 +129,18 @@ def human_social_network(grid, geodesic, connect_dist, *args):
     for i in range(0, grid[0]):
         for j in range(0, grid[1]):
             grid_locations[node_count] = (i, j)
-            G.add_node((i, j), extraversion=connect_dist(*args))
             node_count = node_count + 1
     G = nx.convert_node_labels_to_integers(G)
+    set_column(G, 'extraversion', connect_dist(*args, size=node_count))
 
     # Continue movement process until network required geodesic is reached
     i = 0
-    curr_geodesic = nx.average_shortest_path_length(G)
+    with prof.timer('distance'):
+        curr_geodesic = average_shortest_path_length(G)
     while (geodesic < curr_geodesic):
         G, grid_locations = _run_sim(G, grid_locations, grid)
-        curr_geodesic = nx.average_shortest_path_length(G)
+        with prof.timer('distance'):
+            curr_geodesic = average_shortest_path_length(G)
         i = i + 1
         # print("Stage2:" + str(i) + "," + str(curr_geodesic))
 
@@ -148,6 +164,7 @@ def human_social_network_iterations(grid, iterations, output_geodesic, connect_d
         If True, outputs the geodesic on each iteration (takes longer)
     connect_dist : function
         Distribution function from which to draw probaility of connection / migration values.
+        Called once as connect_dist(*args, size=number of nodes), e.g. numpy.random.beta.
     args : arguments
         Arguments needed for the probability distribution
 
@@ -176,18 +193,18 @@ def human_social_network_iterations(grid, iterations, output_geodesic, connect_d
     for i in range(0, grid[0]):
         for j in range(0, grid[1]):
             grid_locations[node_count] = (i, j)
-            G.add_node((i, j), extraversion=connect_dist(*args))
             node_count = node_count + 1
     G = nx.convert_node_labels_to_integers(G)
+    set_column(G, 'extraversion', connect_dist(*args, size=node_count))
 
     # Continue movement process for specified number of iterations
     i = 0
-    curr_geodesic = nx.average_shortest_path_length(G)
     while (i < iterations):
         G, grid_locations = _run_sim(G, grid_locations, grid)
         i = i + 1
         if output_geodesic:
-            curr_geodesic = nx.average_shortest_path_length(G)
+            with prof.timer('distance'):
+                curr_geodesic = average_shortest_path_length(G)
             print("Stage2:" + str(i) + "," + str(curr_geodesic))
         # else:
         #     print("Stage2:" + str(i))
@@ -249,22 +266,21 @@ def human_social_network_iterations_correlated(grid, iterations, output_geodesic
     for i in range(0, grid[0]):
         for j in range(0, grid[1]):
             grid_locations[node_count] = (i, j)
-
-            ext_conf_vals = df[node_count + 1].split()
-            G.add_node((i, j), extraversion=float(ext_conf_vals[1]))
-            G.add_node((i, j), conformity=float(ext_conf_vals[2]))
-
             node_count = node_count + 1
     G = nx.convert_node_labels_to_integers(G)
+    # First line is the header, columns are row name, extraversion, conformity
+    ext_conf_vals = np.loadtxt(df[1:node_count + 1], usecols=(1, 2), ndmin=2)
+    set_column(G, 'extraversion', ext_conf_vals[:, 0])
+    set_column(G, 'conformity', ext_conf_vals[:, 1])
 
     # Continue movement process for specified number of iterations
     i = 0
-    curr_geodesic = nx.average_shortest_path_length(G)
     while (i < iterations):
         G, grid_locations = _run_sim(G, grid_locations, grid)
         i = i + 1
         if output_geodesic:
-            curr_geodesic = nx.average_shortest_path_length(G)
+            with prof.timer('distance'):
+                curr_geodesic = average_shortest_path_length(G)
             print("Stage2:" + str(i) + "," + str(curr_geodesic))
         # else:
         #     print("Stage2:" + str(i))
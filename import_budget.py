@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the modules every simulation run starts with.
+
+run.py and the sweep scripts start a fresh interpreter per run, so whatever network_generator_prestige and
+human_social_network_generator34 import is paid hundreds of times. Each module is imported in a new
+interpreter (the fastest of a few tries is kept) and the check fails, with exit status 1, if one takes
+longer than the budget or pulls in a plotting or fitting dependency, which are only to be imported when
+first used.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = ('network_generator_prestige', 'human_social_network_generator34')
+# Loaded only by the functions that need them
+LAZY = ('matplotlib', 'scipy.stats', 'scipy.optimize', 'scipy.sparse')
+
+parser = argparse.ArgumentParser(description="Fail if the simulation modules take too long to import")
+parser.add_argument('-m', '--budget', help='float - milliseconds allowed per module', default=600)
+parser.add_argument('-r', '--repeats', help='int - fresh interpreters per module, the fastest is kept', default=3)
+parser.add_argument('modules', help='modules to check, default ' + ' '.join(MODULES), nargs='*')
+
+_PROBE = ("import json, sys, time\n"
+          "start = time.perf_counter()\n"
+          "import {0}\n"
+          "print(json.dumps([time.perf_counter() - start, sorted(m for m in {1!r} if m in sys.modules)]))")
+
+
+def import_cost(module, repeats=3):
+    """Returns (milliseconds, lazy modules loaded) of importing module in a fresh interpreter"""
+    best = float('inf')
+    for repeat in range(repeats):
+        output = subprocess.check_output([sys.executable, '-c', _PROBE.format(module, LAZY)])
+        seconds, loaded = json.loads(output.decode().splitlines()[-1])
+        best = min(best, seconds * 1000)
+    return best, loaded
+
+
+def check(modules=MODULES, budget=600, repeats=3):
+    """Returns a message for every module over budget or loading a lazy dependency, see the module docstring"""
+    failures = []
+    for module in modules:
+        milliseconds, loaded = import_cost(module, repeats)
+        print("{0}: {1:.0f} ms".format(module, milliseconds), file=sys.stderr)
+        if milliseconds > budget:
+            failures.append("{0} took {1:.0f} ms to import, budget {2:.0f} ms".format(module, milliseconds, budget))
+        if loaded:
+            failures.append("{0} imports {1}".format(module, ', '.join(loaded)))
+    return failures
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    failures = check(args.modules or MODULES, float(args.budget), int(args.repeats))
+    for failure in failures:
+        print("OVER BUDGET " + failure)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Array-based initial conditions for DSIT replicates.
+
+Every function returns the starting values of a whole batch of replicates as an int8 array of shape
+(replicates, numNodes). The distributions are the same as those of the original per-node loops in the
+simulation scripts, only drawn for all replicates at once.
+"""
+
+import numpy as np
+
+
+def neighbour_table(net):
+    """
+    Returns an array with one row per node holding the node itself followed by its neighbours in
+    graph order, padded with numNodes (an index past the last node).
+    """
+    num_nodes = len(net.nodes)
+    indptr = np.asarray(net.indptr)
+    indices = np.asarray(net.indices)
+    degree = np.diff(indptr)
+    table = np.full((num_nodes, 1 + int(degree.max(initial=0))), num_nodes, dtype=np.int64)
+    table[:, 0] = np.arange(num_nodes)
+    rows = np.repeat(np.arange(num_nodes), degree)
+    cols = 1 + np.arange(len(indices)) - np.repeat(indptr[:-1], degree)
+    table[rows, cols] = indices
+    return table
+
+
+def random_batch(net, replicates, rng):
+    """Every node independently starts at 0 or 1 with equal probability."""
+    return rng.randint(2, size=(replicates, len(net.nodes))).astype(np.int8)
+
+
+def homophilous_batch(net, replicates, rng, fraction=0.5):
+    """
+    Randomly pick individuals and give the opinion to them and all their friends until the fraction is
+    reached, for every replicate at once.
+
+    Notes
+    -----
+    Each round, every replicate still below the fraction picks one node. The node and its friends form
+    that replicate's frontier for the round, and the whole frontier is converted with one fancy-indexed
+    assignment. As in the original loop, the picked node always converts and the friends convert in graph
+    order until the count reaches the fraction, so the count can exceed it by one.
+    """
+    num_nodes = len(net.nodes)
+    target = num_nodes * fraction
+    candidates = neighbour_table(net)
+    # The extra column is where the padding points. It is kept at 1 so padding never looks unconverted.
+    values = np.zeros((replicates, num_nodes + 1), dtype=np.int8)
+    values[:, num_nodes] = 1
+    counter = np.zeros(replicates, dtype=np.int64)
+
+    active = np.flatnonzero(counter < target)
+    while len(active):
+        frontier = candidates[rng.randint(num_nodes, size=len(active))]
+        is_new = values[active[:, None], frontier] == 0
+        new_friends = is_new[:, 1:]
+        # Converted friends before each position. The loop only stops after converting a friend that
+        # brought the count to the fraction, so the first new friend is always converted.
+        before = np.cumsum(new_friends, axis=1) - new_friends
+        start = counter[active] + is_new[:, 0]
+        take = is_new.copy()
+        take[:, 1:] &= (start[:, None] + before < target) | (before == 0)
+
+        rows = np.broadcast_to(active[:, None], frontier.shape)
+        values[rows[take], frontier[take]] = 1
+        counter[active] += take.sum(axis=1)
+        active = active[counter[active] < target]
+
+    return values[:, :num_nodes]
+
+
+def jesus_seed(net):
+    """Returns the position of the most extraverted person (Jesus). Ties go to the earliest node."""
+    return int(np.argmax(net.extraversion))
+
+
+def disciples_batch(net, replicates, rng, seed, disciples):
+    """
+    Returns a (replicates, numNodes) array marking the seed and, for each replicate, the given number
+    of its friends sampled without replacement (all of them if it has no more than that).
+    """
+    num_nodes = len(net.nodes)
+    values = np.zeros((replicates, num_nodes), dtype=np.int8)
+    values[:, seed] = 1
+    friends = np.asarray(net.indices[net.indptr[seed]:net.indptr[seed + 1]])
+    if disciples <= 0:
+        return values
+    if disciples < len(friends):
+        # The first columns of a random permutation of the friends, one permutation per replicate
+        order = np.argsort(rng.random_sample((replicates, len(friends))), axis=1)[:, :disciples]
+        values[np.arange(replicates)[:, None], friends[order]] = 1
+    else:
+        values[:, friends] = 1
+    return values
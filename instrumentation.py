@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Lightweight profiling of production runs.
+
+The generators, the prestige process and the DSIT engine report into named phase timers (migration,
+centrality, distance, sampling, removal, metrics, io, ...) and counters (bfs_calls, random_picks, flips,
+edges_added, edges_removed, ...). Everything is off by default. It is switched on by setting the
+MS_PROFILE environment variable, by the --profile flag of the scripts, or by calling enable(). The
+summary is written at exit to stderr (MS_PROFILE=1) or to a sidecar JSON file (MS_PROFILE=<file>.json).
+
+Timers nest: a phase timed inside another (metrics and io inside dsit) is reported under the phase it
+first ran in, and shares are taken of the total of the top-level phases, so no time is counted twice.
+
+Hot loops should count locally and report totals once, so a disabled run pays only one call per phase.
+"""
+
+import atexit
+import collections
+import json
+import os
+import sys
+import time
+
+ENABLED = False
+_destination = None
+_seconds = collections.defaultdict(float)
+_calls = collections.defaultdict(int)
+_counters = collections.defaultdict(int)
+# Phase each phase first ran inside, None for top-level phases
+_parents = {}
+# Names of the timers currently running, innermost last
+_active = []
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _parents.setdefault(self.name, _active[-1] if _active else None)
+        _active.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _seconds[self.name] += time.perf_counter() - self.start
+        _calls[self.name] += 1
+        _active.pop()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Returns a context manager adding the time spent inside it to the named phase"""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def count(name, amount=1):
+    """Adds amount to the named counter"""
+    if ENABLED:
+        _counters[name] += amount
+
+
+def enable(destination='-'):
+    """
+    Switches instrumentation on and writes the summary at exit to destination: '-' (or '1') for stderr,
+    otherwise the path of a sidecar JSON file.
+    """
+    global ENABLED, _destination
+    if not ENABLED:
+        atexit.register(report)
+    ENABLED = True
+    _destination = destination
+
+
+def reset():
+    """Clears all timers and counters"""
+    _seconds.clear()
+    _calls.clear()
+    _counters.clear()
+    _parents.clear()
+
+
+def summary():
+    """Returns the timers and counters collected so far as a dict"""
+    return {'timers': {name: {'seconds': _seconds[name], 'calls': _calls[name], 'parent': _parents.get(name)}
+                       for name in sorted(_seconds)},
+            'counters': dict(sorted(_counters.items())),
+            'argv': sys.argv}
+
+
+def _print_phases(timers, parent, total, depth=0):
+    """Prints the phases run inside parent, each followed by its own nested phases indented"""
+    phases = [(name, timing) for name, timing in timers.items() if timing['parent'] == parent]
+    for name, timing in sorted(phases, key=lambda item: -item[1]['seconds']):
+        print("{0:<16} {1:10.4f}s {2:6.1%} {3:>10} calls".format('  ' * depth + name, timing['seconds'],
+                                                                  timing['seconds'] / total, timing['calls']),
+              file=sys.stderr)
+        _print_phases(timers, name, total, depth + 1)
+
+
+def report(destination=None):
+    """Writes the summary to stderr or to a sidecar JSON file, see enable"""
+    destination = destination or _destination or '-'
+    data = summary()
+    if destination in ('-', '1'):
+        total = sum(timing['seconds'] for timing in data['timers'].values() if timing['parent'] is None) or 1.0
+        print("---- profile ----", file=sys.stderr)
+        _print_phases(data['timers'], None, total)
+        for name, value in data['counters'].items():
+            print("{0:<16} {1:>12}".format(name, value), file=sys.stderr)
+    else:
+        with open(destination, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+if os.environ.get('MS_PROFILE'):
+    enable(os.environ['MS_PROFILE'])
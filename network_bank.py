@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Directory-based bank of generated networks.
+
+Every network is stored in its own directory <bank>/<key>/ as .npy files (the CSR indptr/indices and
+the extraversion and conformity columns) next to a small meta.json header. Node labels other than
+0..n-1 are written to nodes.json (see graph_snapshots.encode_nodes), so tuple labels survive.
+Reading a network memory-maps the .npy files, so loading one network out of a bank of thousands is
+a constant-time open with nothing to parse.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+from dsit_engine import DSITNetwork, network_arrays
+from graph_snapshots import decode_nodes, encode_nodes
+
+FORMAT_VERSION = 1
+_ARRAYS = (('indptr', np.int64), ('indices', np.int32), ('extraversion', np.float64),
+           ('conformity', np.float64))
+
+
+def write_network(bank, key, network, metadata=None):
+    """
+    Stores a network in the bank under key, replacing any network already stored there.
+
+    Parameters
+    ----------
+    bank : str
+        Bank directory. Created if it does not exist.
+    key : str
+        Name of the network within the bank
+    network : Graph or DSITNetwork
+        Network with 'extraversion' and 'conformity' node attributes, or its arrays
+    metadata : dict
+        Anything JSON serializable describing how the network was made (grid, iterations, beta
+        parameters, ...). Stored in meta.json.
+    """
+    net = network if isinstance(network, DSITNetwork) else network_arrays(network)
+    nodes = list(net.nodes)
+    integer_labels = nodes == list(range(len(nodes)))
+    # Encoded first, so that labels JSON cannot hold fail before anything is written
+    labels = None if integer_labels else encode_nodes(nodes)
+    os.makedirs(bank, exist_ok=True)
+    # Written to a temporary directory first so readers never see a half written network
+    staging = tempfile.mkdtemp(dir=bank, prefix='.' + key + '.')
+    for field, dtype in _ARRAYS:
+        np.save(os.path.join(staging, field + '.npy'), np.asarray(getattr(net, field), dtype=dtype))
+    if not integer_labels:
+        with open(os.path.join(staging, 'nodes.json'), 'w') as f:
+            f.write(labels)
+    header = {'format': FORMAT_VERSION, 'num_nodes': len(nodes), 'num_entries': len(net.indices),
+              'integer_labels': integer_labels, 'metadata': metadata or {}}
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump(header, f)
+
+    target = os.path.join(bank, key)
+    if os.path.isdir(target):
+        # Moved aside rather than deleted, so the old network stays whole until the new one is in place
+        retired = staging + '.old'
+        os.replace(target, retired)
+        os.replace(staging, target)
+        shutil.rmtree(retired)
+    else:
+        os.replace(staging, target)
+
+
+def read_metadata(bank, key):
+    """Returns the meta.json header of a stored network"""
+    with open(os.path.join(bank, key, 'meta.json')) as f:
+        return json.load(f)
+
+
+def read_network(bank, key, mmap_mode='r'):
+    """
+    Returns a stored network as a DSITNetwork whose arrays are memory-mapped from the bank.
+    Use mmap_mode=None to load the arrays into memory instead.
+    """
+    header = read_metadata(bank, key)
+    if header['format'] != FORMAT_VERSION:
+        raise ValueError("Unsupported network bank format: " + str(header['format']))
+    directory = os.path.join(bank, key)
+    arrays = {field: np.load(os.path.join(directory, field + '.npy'), mmap_mode=mmap_mode)
+              for field, dtype in _ARRAYS}
+    if header['integer_labels']:
+        nodes = range(header['num_nodes'])
+    elif os.path.isfile(os.path.join(directory, 'nodes.json')):
+        with open(os.path.join(directory, 'nodes.json')) as f:
+            nodes = decode_nodes(f.read())
+    else:
+        # Written before labels were stored as JSON
+        nodes = np.load(os.path.join(directory, 'nodes.npy')).tolist()
+    return DSITNetwork(nodes, arrays['indptr'], arrays['indices'], arrays['extraversion'],
+                       arrays['conformity'])
+
+
+def network_keys(bank):
+    """Returns the keys of all networks in the bank"""
+    return sorted(name for name in os.listdir(bank)
+                  if not name.startswith('.') and os.path.isfile(os.path.join(bank, name, 'meta.json')))
+
+
+def read_graph(bank, key):
+    """Returns a stored network as a networkx graph with 'extraversion' and 'conformity' attributes"""
+    net = read_network(bank, key)
+    g = nx.Graph()
+    for i, node in enumerate(net.nodes):
+        g.add_node(node, extraversion=float(net.extraversion[i]), conformity=float(net.conformity[i]))
+    indptr = np.asarray(net.indptr)
+    source = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    upper = source < net.indices
+    nodes = list(net.nodes)
+    g.add_edges_from((nodes[i], nodes[j]) for i, j in zip(source[upper].tolist(), net.indices[upper].tolist()))
+    return g
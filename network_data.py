@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 
-import matplotlib.pyplot as plt
 import collections
-import networkx as nx
-import scipy.stats as stats
-import scipy.optimize as optimize
 import numpy as np
 
-def degree_distribution_plot(G):
+from graph_backend import ArrayGraph, as_backend, cached
+
+# matplotlib, scipy.stats and scipy.sparse are imported where they are used, so that importing this
+# module (and network_generator_prestige through it) stays cheap for the many short runs of a sweep
+
+# Degree distribution of a network, see degree_summary
+DegreeSummary = collections.namedtuple('DegreeSummary', ['degrees', 'counts', 'mean', 'skew', 'ccdf'])
+
+def degree_distribution_plot(G, summary=None):
     """
     Makes a plot for the degree distribution of the inputted graph where the y axis corresponds to the fraction of nodes
     in the graph and the x axis corresponds to the degree of a node. Both axes uses a logarithmic scale.
@@ -16,95 +20,541 @@ def degree_distribution_plot(G):
     ----------
     G : Graph
         A graph corresponding to a human social network.
+    summary : DegreeSummary
+        Degree summary of G, see degree_summary
 
     Notes
     -----
-    Values on axes are predetermined and may not be optimal for a given graph.
+    Values on axes are predetermined and may not be optimal for a given graph. Use batch_render to write
+    the plots of many graphs to files.
     """
 
+    import matplotlib.pyplot as plt
+    from batch_render import draw_degree_distribution
+
     # Adapted from https://networkx.github.io/documentation/stable/auto_examples/drawing/plot_degree_histogram.html
-    num_nodes = G.number_of_nodes()
-    degrees = [G.degree(n) for n in G.nodes]
-    degreeCount = collections.Counter(degrees)
-    deg, cnt = zip(*degreeCount.items())
-    cnt_frac = []
-    for i in range(len(cnt)):
-        cnt_frac.append(cnt[i] / num_nodes)
-
-    plt.scatter(deg, cnt_frac, s=10)
-
-    plt.title("Degree Distribution")
-    plt.ylabel("Fraction")
-    plt.yscale("log")
-    y_ticks = [1, 0.1, 0.01, 0.001, 0.0001]
-    plt.yticks(y_ticks, y_ticks)
-    plt.xlabel("Degree")
-    plt.xscale("log")
-    x_ticks = [3, 30, 300]
-    plt.xticks(x_ticks, x_ticks)
+    if summary is None:
+        summary = degree_summary(G)
+    draw_degree_distribution(plt.gca(), summary.counts)
 
     plt.show(block=False)
 
 def double_power_pdf(xs, x_min, alpha1, alpha2, switch):
-    vals = []
-    for x in xs:
-        if x < switch:
-            val = ((alpha1 - 1)/x_min) * ((x / x_min) ** (-alpha1))
-        else:
-            val = ((alpha1 - 1)/x_min) * ((switch / x_min)**(-alpha1)) * ((x / switch) ** (-alpha2))
-        vals.append(val)
-    return vals
+    """Continuous broken power-law density at xs, evaluated as one array expression"""
+    xs = np.asarray(xs, dtype=float)
+    below = ((alpha1 - 1)/x_min) * ((xs / x_min) ** (-alpha1))
+    above = ((alpha1 - 1)/x_min) * ((switch / x_min)**(-alpha1)) * ((xs / switch) ** (-alpha2))
+    return np.where(xs < switch, below, above)
 
 def double_power_cdf(xs, x_min, alpha1, alpha2, switch):
-    vals = []
-    for x in xs:
-        if x < switch:
-            val = ((x_min * (x ** alpha1)) - ((x_min ** alpha1) * x)) / (x_min * (x ** alpha1))
-        else:
-            val = ((x_min * (switch ** alpha1)) - ((x_min ** alpha1) * switch)) / (x_min * (switch ** alpha1))
-            val += ((alpha1 - 1) * (x_min ** (alpha1 - 1)) * (switch * (x ** (alpha2)) - ((switch ** alpha2) * x)) *
-                    (switch ** (-alpha1)) * (x ** (-alpha2))) / (alpha2 - 1)
-        vals.append(val)
-    return vals
-
-def ks_test(G):
-    """
-    Prints the characteristic path length (geodesic) of the inputted network, the clustering coefficient of the inputted
-    network, and Kolmogorov-Smirnov test results for the similarity of the degree distribution with a power law
-    distribution of the inputted network.
+    """Continuous broken power-law distribution function at xs, evaluated as one array expression"""
+    xs = np.asarray(xs, dtype=float)
+    below = ((x_min * (xs ** alpha1)) - ((x_min ** alpha1) * xs)) / (x_min * (xs ** alpha1))
+    at_switch = ((x_min * (switch ** alpha1)) - ((x_min ** alpha1) * switch)) / (x_min * (switch ** alpha1))
+    above = at_switch + ((alpha1 - 1) * (x_min ** (alpha1 - 1)) * (switch * (xs ** (alpha2)) - ((switch ** alpha2) * xs)) *
+                         (switch ** (-alpha1)) * (xs ** (-alpha2))) / (alpha2 - 1)
+    return np.where(xs < switch, below, above)
+
+def adjacency_arrays(G):
+    """
+    Returns the CSR (indptr, indices) arrays of a networkx graph, graph backend or DSITNetwork. A
+    DSITNetwork (or anything else with indptr/indices) is used as it is, so metrics share its arrays.
+    An ArrayGraph keeps them cached while it is unchanged, other graphs are converted on every call.
+    """
+    if hasattr(G, 'indptr'):
+        return np.asarray(G.indptr), np.asarray(G.indices)
+    if isinstance(G, ArrayGraph):
+        return cached(G, 'csr', _csr_arrays)
+    return _csr_arrays(G)
+
+
+def _csr_arrays(G):
+    nodes, indptr, indices = as_backend(G).csr()
+    return np.asarray(indptr), np.asarray(indices)
+
+
+def degree_array(G):
+    """Returns the degree of every node of a networkx graph, graph backend or DSITNetwork as an array"""
+    if hasattr(G, 'indptr'):
+        return np.diff(np.asarray(G.indptr))
+    if hasattr(G, 'graph') and not hasattr(G, 'csr'):
+        return np.fromiter((d for n, d in G.degree()), dtype=np.int64, count=G.number_of_nodes())
+    graph = as_backend(G)
+    return np.array([graph.degree(n) for n in graph.nodes()], dtype=np.int64)
+
+
+def summarize_degrees(degrees):
+    """
+    Returns the DegreeSummary of a degree sequence: the degrees as an array, the number of nodes of each
+    degree 0..x_max (see degree_histogram), mean, skew and the CCDF, the fraction of nodes of degree k or
+    more for k = 0..x_max. Everything comes from one np.bincount.
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    counts, x_max = degree_histogram(degrees)
+    k = np.arange(x_max + 1)
+    num_nodes = len(degrees)
+    mean = (k * counts).sum() / num_nodes
+    # Central moments from the histogram, as scipy.stats.skew (biased)
+    deviation = k - mean
+    variance = (counts * deviation ** 2).sum() / num_nodes
+    skew = (counts * deviation ** 3).sum() / num_nodes / variance ** 1.5 if variance > 0 else np.nan
+    ccdf = np.cumsum(counts[::-1])[::-1] / num_nodes
+    return DegreeSummary(degrees, counts, float(mean), float(skew), ccdf)
+
+
+def degree_summary(G):
+    """
+    Returns the DegreeSummary of a networkx graph, graph backend or DSITNetwork. Only an ArrayGraph, which
+    counts its own edits, keeps it cached (see graph_backend.cached): any other graph can change without
+    notice, so its summary is built on every call. Pass it on as summary to degree_distribution_plot and
+    ks_test to share it between the metrics of one graph state.
+    """
+    if isinstance(G, ArrayGraph):
+        return cached(G, 'degree_summary', lambda graph: summarize_degrees(degree_array(graph)))
+    return summarize_degrees(degree_array(G))
+
+
+def _triangles(indptr, indices):
+    """Number of triangles through each node"""
+    from scipy import sparse
+    num_nodes = len(indptr) - 1
+    A = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(num_nodes, num_nodes))
+    return np.asarray((A @ A).multiply(A).sum(axis=1)).ravel() / 2
+
+
+def _node_triangles(G, indptr, indices):
+    """Triangles through each node of G, memoized per graph state unless G is a DSITNetwork"""
+    if hasattr(G, 'indptr'):
+        return _triangles(indptr, indices)
+    return cached(G, 'triangles', lambda graph: _triangles(indptr, indices))
+
+
+def _edge_keys(indptr, indices):
+    """Every edge as a sorted key source * n + target"""
+    num_nodes = len(indptr) - 1
+    source = np.repeat(np.arange(num_nodes, dtype=np.int64), np.diff(indptr))
+    return np.sort(source * num_nodes + indices)
+
+
+def _node_edge_keys(G, indptr, indices):
+    """Sorted edge keys of G, memoized per graph state unless G is a DSITNetwork"""
+    if hasattr(G, 'indptr'):
+        return _edge_keys(indptr, indices)
+    return cached(G, 'edge_keys', lambda graph: _edge_keys(indptr, indices))
+
+
+def _closed_wedges(indptr, indices, keys, centers, rng):
+    """
+    Samples one wedge (two distinct neighbours) at each center and returns which ones are closed, looking
+    the pairs up in the sorted edge keys by binary search
+    """
+    num_nodes = len(indptr) - 1
+    degree = np.diff(indptr)[centers]
+    first = (rng.random_sample(len(centers)) * degree).astype(np.int64)
+    second = (rng.random_sample(len(centers)) * (degree - 1)).astype(np.int64)
+    second = second + (second >= first)
+    a = indices[indptr[centers] + first].astype(np.int64)
+    b = indices[indptr[centers] + second].astype(np.int64)
+    query = a * num_nodes + b
+    found = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return keys[found] == query
+
+
+def wedge_samples(epsilon, delta):
+    """Number of samples for an additive error of at most epsilon with probability 1 - delta (Hoeffding)"""
+    return int(np.ceil(np.log(2 / delta) / (2 * epsilon ** 2)))
+
+
+def average_clustering(G, estimator='exact', epsilon=0.01, delta=0.05, rng=np.random):
+    """
+    Returns the average clustering coefficient of the inputted network, as nx.average_clustering (nodes
+    with fewer than two neighbours count as 0).
+
+    Parameters
+    ----------
+    G : Graph, graph backend or DSITNetwork
+        Network to measure
+    estimator : str
+        'exact' counts triangles with one sparse matrix product. 'wedge' estimates by wedge sampling:
+        each sample picks a node at random and one random pair of its neighbours and checks whether
+        the pair is connected.
+    epsilon, delta : float
+        For 'wedge', the estimate is within epsilon of the exact value with probability 1 - delta
+    rng : RandomState
+        Source of randomness for 'wedge', numpy.random by default
+
+    Notes
+    -----
+    Wedge sampling looks k = ln(2 / delta) / (2 epsilon ** 2) samples up in the m edges sorted as
+    keys, O(k log m) independent of the degrees, where the exact count grows with the sum of squared
+    degrees. Sorting the keys is O(m log m) and, as the triangle counts, is done once per graph state
+    (see graph_backend.cached), except for a DSITNetwork, which is sorted on every call. Recognising
+    the state of a networkx graph hashes its adjacency, O(n + m) per call, so the O(k log m) bound
+    holds for repeated calls on an ArrayGraph.
+    """
+    indptr, indices = adjacency_arrays(G)
+    degree = np.diff(indptr)
+    if estimator == 'exact':
+        wedges = degree * (degree - 1) / 2
+        coefficients = np.divide(_node_triangles(G, indptr, indices), wedges, out=np.zeros(len(degree)),
+                                 where=wedges > 0)
+        return float(coefficients.mean())
+    if estimator != 'wedge':
+        raise ValueError("Unknown clustering estimator: " + str(estimator))
+    samples = wedge_samples(epsilon, delta)
+    centers = rng.randint(len(degree), size=samples)
+    centers = centers[degree[centers] >= 2]
+    keys = _node_edge_keys(G, indptr, indices)
+    return float(_closed_wedges(indptr, indices, keys, centers, rng).sum() / samples)
+
+
+def global_clustering(G, estimator='exact', epsilon=0.01, delta=0.05, rng=np.random):
+    """
+    Returns the global clustering coefficient (transitivity), the share of all wedges that are closed.
+
+    Parameters
+    ----------
+    See average_clustering. For 'wedge' the centers are drawn in proportion to the number of wedges
+    at each node, so every wedge of the network is equally likely to be sampled.
+    """
+    indptr, indices = adjacency_arrays(G)
+    degree = np.diff(indptr)
+    wedges = degree * (degree - 1) / 2
+    if wedges.sum() == 0:
+        return 0.0
+    if estimator == 'exact':
+        return float(_node_triangles(G, indptr, indices).sum() / wedges.sum())
+    if estimator != 'wedge':
+        raise ValueError("Unknown clustering estimator: " + str(estimator))
+    centers = rng.choice(len(degree), size=wedge_samples(epsilon, delta), p=wedges / wedges.sum())
+    keys = _node_edge_keys(G, indptr, indices)
+    return float(_closed_wedges(indptr, indices, keys, centers, rng).mean())
+
+
+#############################################################################
+#### Discrete power-law fits ################################################
+#############################################################################
+# Both degree models are log-linear over the integer support k = x_min..x_max: p(k) is proportional to
+# exp(features[k] . theta). For a power law the single feature is -ln k and theta is alpha. For a broken
+# power law with switch s the features are (-ln k, 0) below s and (-ln s, ln s - ln k) from s on, so
+# that the two pieces meet at s, and theta is (alpha1, alpha2). The log-likelihood of a log-linear
+# model is concave, so Newton's method with the analytic gradient and Hessian converges in a few steps,
+# and many fits (x_min or switch candidates, bootstrap samples) run at once as one batch.
+
+def _fit_loglinear(counts, features, support, theta, iterations=50, tol=1e-7):
+    """
+    Maximum likelihood fit of a batch of log-linear models on the integer support.
+
+    Parameters
+    ----------
+    counts : ndarray (B, K)
+        Number of observations of each k, zero outside the support
+    features : ndarray (B, K, D) or (K, D)
+        Features of each k
+    support : ndarray (B, K) bool
+        Support of each model
+    theta : ndarray (B, D)
+        Starting parameters
+
+    Returns
+    -------
+    (theta, loglik, pmf) with pmf the fitted probability of each k, shape (B, K)
+    """
+    counts = np.asarray(counts, dtype=float)
+    # Laid out as (B, D, K) so that every sum over k runs over contiguous memory
+    features = np.ascontiguousarray(np.broadcast_to(features, support.shape + (theta.shape[1],)).transpose(0, 2, 1))
+    offset = np.where(support, 0.0, -np.inf)
+    n = counts.sum(axis=1)
+    observed = (features * counts[:, None, :]).sum(axis=2)
+    ridge = 1e-9 * np.eye(theta.shape[1])
+    theta = np.array(theta, dtype=float)
+    # Models drop out of the batch as they converge
+    active = np.arange(len(theta))
+    for i in range(iterations):
+        if len(active) == 0:
+            break
+        batch = features[active] if len(active) < len(theta) else features
+        pmf, log_norm = _normalized(batch, offset[active], theta[active])
+        weighted = batch * pmf[:, None, :]
+        mean = weighted.sum(axis=2)
+        gradient = observed[active] - n[active, None] * mean
+        covariance = np.matmul(weighted, batch.transpose(0, 2, 1)) - mean[:, :, None] * mean[:, None, :]
+        step = np.linalg.solve(n[active, None, None] * covariance + ridge, gradient[:, :, None])[:, :, 0]
+        step = np.clip(step, -4, 4)
+        theta[active] = theta[active] + step
+        active = active[np.abs(step).max(axis=1) >= tol]
+    pmf, log_norm = _normalized(features, offset, theta)
+    loglik = (observed * theta).sum(axis=1) - n * log_norm
+    return theta, loglik, pmf
+
+
+def _normalized(features, offset, theta):
+    """Returns the probabilities of each k and the log normalizing constant of a batch of models"""
+    logits = offset + (features * theta[:, :, None]).sum(axis=1)
+    top = logits.max(axis=1, keepdims=True)
+    pmf = np.exp(logits - top)
+    norm = pmf.sum(axis=1, keepdims=True)
+    return pmf / norm, top[:, 0] + np.log(norm[:, 0])
+
+
+def _log_support(x_max):
+    """ln k for k = 0..x_max, with ln 0 replaced by 0 (k = 0 is never in the support)"""
+    ks = np.arange(x_max + 1, dtype=float)
+    ks[0] = 1
+    return np.log(ks)
+
+
+def _ks_distance(counts, pmf, support):
+    """Largest gap between the empirical and fitted distribution functions of each model in a batch"""
+    empirical = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+    return np.where(support, np.abs(empirical - np.cumsum(pmf, axis=1)), 0).max(axis=1)
+
+
+def degree_histogram(degrees, x_max=None):
+    """
+    Returns (counts, x_max): the number of nodes of each degree 0..x_max. x_max defaults to n - 1 for n
+    degrees, the largest degree possible in a simple graph of n nodes, which is the support of the fits
+    of Clauset, Shalizi and Newman. A smaller x_max truncates the fitted laws at x_max: the fits get
+    faster, but the exponents are those of a truncated law, biased against the untruncated estimates,
+    and can fall to 1 or below. An x_max below the largest degree raises ValueError.
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    if x_max is None:
+        x_max = max(len(degrees) - 1, int(degrees.max()))
+    elif x_max < degrees.max():
+        raise ValueError("x_max {0} is below the largest degree {1}".format(x_max, int(degrees.max())))
+    return np.bincount(degrees, minlength=x_max + 1), x_max
+
+
+def _best_per_row(rows, scores):
+    """Returns the position of the lowest score of every row in a flattened batch (rows sorted)"""
+    order = np.lexsort((scores, rows))
+    return order[np.r_[0, np.flatnonzero(np.diff(rows[order])) + 1]]
+
+
+def fit_power_law_histograms(counts, x_min=None, min_tail=10):
+    """
+    Fits a discrete power law to every row of a batch of degree histograms, see fit_power_law.
+    The x_min candidates of all rows are fitted together as one batch.
+
+    Parameters
+    ----------
+    counts : ndarray (S, K)
+        Number of nodes of each degree 0..K-1 in each of S degree sequences, see degree_histogram
+    x_min : int or array
+        Fixed lower end for all rows or for each row, selected per row if None
+
+    Returns
+    -------
+    (alpha, x_min, ks) arrays with one entry per row
+    """
+    counts = np.asarray(counts)
+    num_rows, size = counts.shape
+    ks = np.arange(size)
+    log_k = _log_support(size - 1)
+    if x_min is None:
+        tail = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+        positive = (counts > 0) & (ks >= 1)
+        candidates = positive & (tail >= min_tail)
+        # Too few nodes for any candidate: fall back to the smallest degree
+        short = np.flatnonzero(~candidates.any(axis=1))
+        candidates[short, np.argmax(positive[short], axis=1)] = True
+        rows, x_mins = np.nonzero(candidates)
+    else:
+        rows = np.arange(num_rows)
+        x_mins = np.broadcast_to(np.asarray(x_min), (num_rows,))
+
+    support = (ks[None, :] >= x_mins[:, None]) & (ks >= 1)
+    tail_counts = np.where(support, counts[rows], 0)
+    # Continuous approximation of the MLE as the starting point
+    start = 1 + tail_counts.sum(axis=1) / (tail_counts * (log_k - np.log(x_mins[:, None] - 0.5))).sum(axis=1)
+    theta, loglik, pmf = _fit_loglinear(tail_counts, -log_k[:, None], support, start[:, None])
+    distances = _ks_distance(tail_counts, pmf, support)
+    best = _best_per_row(rows, distances)
+    return theta[best, 0], x_mins[best], distances[best]
+
+
+def fit_power_law(degrees, x_min=None, x_max=None, min_tail=10):
+    """
+    Fits a discrete power law p(k) ~ k^-alpha for x_min <= k <= x_max to a degree sequence by maximum
+    likelihood, in the manner of Clauset, Shalizi and Newman (2009).
+
+    Parameters
+    ----------
+    degrees : array
+        Degree of every node
+    x_min : int
+        Lower end of the power law. If None it is selected as the degree that minimizes the KS
+        distance between the data at or above it and the fitted law, among degrees with at least
+        min_tail nodes at or above them.
+    x_max : int
+        Upper end of the support, n - 1 by default. A smaller value truncates the law, see
+        degree_histogram.
+
+    Returns
+    -------
+    (alpha, x_min, ks) with ks the KS distance of the fit
+    """
+    counts, x_max = degree_histogram(degrees, x_max)
+    alpha, x_min, distance = fit_power_law_histograms(counts[None, :], x_min, min_tail)
+    return float(alpha[0]), int(x_min[0]), float(distance[0])
+
+
+def power_law_pmf(alpha, x_min, x_max):
+    """Returns the discrete power-law probabilities of k = 0..x_max"""
+    support = (np.arange(x_max + 1) >= max(x_min, 1))[None, :]
+    theta = np.array([[alpha]])
+    return _fit_loglinear(np.zeros(support.shape), -_log_support(x_max)[:, None], support, theta, 0)[2][0]
+
+
+def _broken_features(log_k, switches):
+    """Features (B, K, 2) of broken power laws switching at each of switches"""
+    log_s = np.log(switches)[:, None]
+    below = np.arange(len(log_k))[None, :] < switches[:, None]
+    first = np.where(below, -log_k[None, :], -log_s)
+    second = np.where(below, 0, log_s - log_k[None, :])
+    return np.stack([first, second], axis=2)
+
+
+def fit_broken_power_law_histograms(counts, x_min=None, min_side=2):
+    """
+    Fits a discrete broken power law to every row of a batch of degree histograms, see
+    fit_broken_power_law. The switch candidates of all rows are fitted together as one batch.
+
+    Returns
+    -------
+    (alpha1, alpha2, switch, ks) arrays with one entry per row
+    """
+    counts = np.asarray(counts)
+    num_rows, size = counts.shape
+    ks = np.arange(size)
+    log_k = _log_support(size - 1)
+    if x_min is None:
+        x_mins = np.argmax((counts > 0) & (ks >= 1), axis=1)
+    else:
+        x_mins = np.broadcast_to(np.asarray(x_min), (num_rows,))
+    counts = np.where(ks[None, :] >= x_mins[:, None], counts, 0)
+    # Both exponents have a finite MLE only with data below the switch and strictly above it
+    below = np.cumsum(counts, axis=1) - counts
+    above = counts.sum(axis=1, keepdims=True) - np.cumsum(counts, axis=1)
+    candidates = (counts > 0) & (ks[None, :] > x_mins[:, None]) & (below >= min_side) & (above >= min_side)
+    rows, switches = np.nonzero(candidates)
+
+    alpha1 = np.empty(num_rows)
+    alpha2 = np.empty(num_rows)
+    switch = np.empty(num_rows)
+    distance = np.empty(num_rows)
+    # Rows without any possible switch get a single power law from x_min
+    single = np.flatnonzero(~candidates.any(axis=1))
+    if len(single):
+        alpha, fixed, distance[single] = fit_power_law_histograms(counts[single], x_mins[single])
+        alpha1[single] = alpha2[single] = alpha
+        switch[single] = fixed
+    if len(rows) == 0:
+        return alpha1, alpha2, switch, distance
+
+    support = ks[None, :] >= x_mins[rows, None]
+    batch_counts = counts[rows]
+    # Start from the continuous approximation of the MLE of each piece on its own
+    upper = np.where(ks[None, :] >= switches[:, None], batch_counts, 0)
+    lower = batch_counts - upper
+    start2 = 1 + upper.sum(axis=1) / (upper * (log_k - np.log(switches[:, None] - 0.5))).sum(axis=1)
+    start1 = 1 + lower.sum(axis=1) / (lower * (log_k - np.log(x_mins[rows, None] - 0.5))).clip(0).sum(axis=1)
+    theta, loglik, pmf = _fit_loglinear(batch_counts, _broken_features(log_k, switches), support,
+                                        np.stack([start1, start2], axis=1))
+    best = _best_per_row(rows, -loglik)
+    fitted = rows[best]
+    alpha1[fitted] = theta[best, 0]
+    alpha2[fitted] = theta[best, 1]
+    switch[fitted] = switches[best]
+    distance[fitted] = _ks_distance(batch_counts[best], pmf[best], support[best])
+    return alpha1, alpha2, switch, distance
+
+
+def fit_broken_power_law(degrees, x_min=None, x_max=None, min_side=2):
+    """
+    Fits a discrete broken power law, ~ k^-alpha1 below the switch and ~ k^-alpha2 from the switch on
+    (continuous at the switch), to a degree sequence by maximum likelihood.
+
+    Parameters
+    ----------
+    degrees : array
+        Degree of every node
+    x_min : int
+        Lower end of the law, the smallest positive degree by default
+    x_max : int
+        Upper end of the support, n - 1 by default. A smaller value truncates the law, see
+        degree_histogram.
+    min_side : int
+        Switches are tried at every observed degree with at least min_side nodes below it and
+        min_side nodes above it. All of them are fitted as one batch and the most likely is kept.
+        Without any, both exponents are those of a single power law.
+
+    Returns
+    -------
+    (alpha1, alpha2, switch, ks) with ks the KS distance of the fit
+    """
+    counts, x_max = degree_histogram(degrees, x_max)
+    fit = fit_broken_power_law_histograms(counts[None, :], x_min, min_side)
+    return tuple(float(value[0]) for value in fit)
+
+
+def broken_power_law_pmf(alpha1, alpha2, switch, x_min, x_max):
+    """Returns the discrete broken power-law probabilities of k = 0..x_max"""
+    support = (np.arange(x_max + 1) >= max(x_min, 1))[None, :]
+    features = _broken_features(_log_support(x_max), np.array([switch]))
+    return _fit_loglinear(np.zeros(support.shape), features, support, np.array([[alpha1, alpha2]]), 0)[2][0]
+
+
+def ks_test(G, bootstrap=False, seed=None, summary=None, x_max=None):
+    """
+    Fits a power law and a broken power law to the degree distribution of the inputted network and
+    returns their parameters with Kolmogorov-Smirnov distances.
 
     Parameters
     ----------
     G : Graph
-        A graph corresponding to a human social network.
+        A graph corresponding to a human social network (networkx, graph backend or DSITNetwork).
+    bootstrap : bool
+        Replace the asymptotic p-values by bootstrap p-values, see degree_bootstrap
+    seed : int
+        Seed of the bootstrap
+    summary : DegreeSummary
+        Degree summary of G, see degree_summary
+    x_max : int
+        Upper end of the support of both fits, n - 1 by default as in Clauset, Shalizi and Newman. A
+        smaller value, such as the largest degree, makes the fits faster but fits laws truncated at
+        x_max, whose exponents are biased (see degree_histogram).
+
+    Returns
+    -------
+    (alpha, ks, p, alpha1, alpha2, switch, ks_double, p_double)
 
     Notes
     -----
-    KS test currently not working properly.
-    """
-    num_nodes = G.number_of_nodes()
-    degrees = [G.degree(n) for n in G.nodes]
-    degreeCount = collections.Counter(degrees)
-    deg, cnt = zip(*degreeCount.items())
-    cnt_frac = []
-    for i in range(len(cnt)):
-        cnt_frac.append(cnt[i] / num_nodes)
-
-    sort_deg = sorted(deg)
-    x_min = sort_deg[0]
-    sort_cnt = []
-    for degree in sort_deg:
-        val = degreeCount[degree] / num_nodes
-        sort_cnt.append(val)
-
-    single_pdf = lambda x, alpha: ((alpha - 1)/x_min) * ((x / x_min) ** (-alpha))
-    a = optimize.curve_fit(single_pdf, deg, cnt_frac)[0][0]
-    single_cdf = lambda x: ((x_min * (x ** a)) - ((x_min ** a) * x)) / (x_min * (x ** a))
-    ks1, p1 = stats.kstest(deg, single_cdf)
-
-    double_pdf = lambda xs, a1, a2, switch: double_power_pdf(xs, x_min, a1, a2, switch)
-    a1, a2, switch = optimize.curve_fit(double_pdf, deg, cnt_frac, bounds=([-np.inf, -np.inf, x_min], [np.inf, np.inf, np.inf]))[0]
-    double_cdf = lambda xs: double_power_cdf(xs, x_min, a1, a2, switch)
-    ks2, p2 = stats.kstest(deg, double_cdf)
-
-    return (a, ks1, p1, a1, a2, switch, ks2, p2)
\ No newline at end of file
+    The power law is fitted above the x_min selected by fit_power_law, the broken power law above the
+    smallest degree. Without bootstrap, p and p_double are the asymptotic KS p-values, which are too
+    large when the parameters were fitted to the same data.
+
+    The cost grows with the number of x_min and switch candidates times x_max. For 900 nodes of largest
+    degree 162 (43 x_min and 48 switch candidates) over the full support the power law takes about
+    5 ms and the broken power law about 8 ms.
+    """
+    if summary is None:
+        summary = degree_summary(G)
+    degrees = summary.degrees
+    counts = (summary.counts if x_max is None else degree_histogram(degrees, x_max)[0])[None, :]
+
+    a, x_min, ks1 = (float(value[0]) for value in fit_power_law_histograms(counts))
+    a1, a2, switch, ks2 = (float(value[0]) for value in fit_broken_power_law_histograms(counts))
+
+    if bootstrap:
+        from degree_bootstrap import bootstrap_p_value
+        p1 = bootstrap_p_value(degrees, 'power_law', seed=seed, x_max=x_max)[0]
+        p2 = bootstrap_p_value(degrees, 'broken_power_law', seed=seed, x_max=x_max)[0]
+    else:
+        from scipy import stats
+        p1 = stats.kstwo.sf(ks1, int((degrees >= x_min).sum()))
+        p2 = stats.kstwo.sf(ks2, int((degrees > 0).sum()))
+
+    return (a, ks1, p1, a1, a2, switch, ks2, p2)
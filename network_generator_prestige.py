@@ -4,14 +4,19 @@ import networkx as nx
 import random
 import math
 from network_data import *
-import scipy.stats as stats
 import csv
+import os
 import argparse
+import instrumentation as prof
+from graph_backend import as_backend, average_shortest_path_length, eigenvector_centrality
 
 parser = argparse.ArgumentParser(description="Run prestige network generator")
 parser.add_argument('-n', '--size', help='int - network size is nxn', default=15)
 parser.add_argument('-d', '--decay', help='float - distance decay strength', default=4)
 parser.add_argument('-p', '--birth_death_rate', help='int - frequency of birth-death process', default=0.5)
+parser.add_argument('-c', '--clustering', help='clustering estimator, exact or wedge (sampled)', default='exact')
+parser.add_argument('--profile', help='print phase timings and counters at exit, or write them to the given .json file',
+                    nargs='?', const='-', default=None)
 
 def human_social_network_prestige(grid, geodesic):
     """
@@ -47,33 +52,108 @@ def human_social_network_prestige(grid, geodesic):
         nbrs = [nbr for nbr in G[n]]
         initial_nbrs[n] = nbrs
 
-    while geodesic < nx.average_shortest_path_length(G):
+    graph = as_backend(G)
+    while geodesic < average_shortest_path_length(graph):
         # Only check for desired geodesic every r iterations as the operation is very time consuming
         for j in range(r):
             # Select random person
             n = random.choice(nodes)
-            odds = []
-            centrality = nx.eigenvector_centrality_numpy(G)
-            nbrs = [nbr for nbr in G[n]]
-            nbrs.append(n)
-
-            for optn in nodes:
-                if optn in nbrs:
-                    odds.append(0)
-                else:
-                    dist = nx.shortest_path_length(G, n, optn)
-                    # Set the odds of being connected to based on eigenvector centrality of the option and its
-                    # distance from n
-                    w = centrality[optn] * math.exp(-2*dist)
-                    odds.append(w)
-
-            # Select at random a new connection for n from the list of options given the assigned odds
-            a = random.choices(nodes, weights=odds, k=1)[0]
-            G.add_edge(n, a)
+            _prestige_link(graph, n, nodes, 2)
 
     return G, initial_nbrs
 
-def network_equilibrium(n, d, p, graph=False):
+def _prestige_link(graph, node, nodes, d):
+    """
+    Connects node to a new neighbour chosen with odds given by the eigenvector centrality of each option
+    and its distance from node, and returns the neighbour
+    """
+    odds = []
+    with prof.timer('centrality'):
+        centrality = eigenvector_centrality(graph)
+    nbrs = graph.neighbors(node)
+    nbrs.append(node)
+
+    with prof.timer('distance'):
+        distances = graph.distances(node)
+        for optn in nodes:
+            if optn in nbrs:
+                odds.append(0)
+            else:
+                # Set the odds of being connected to based on eigenvector centrality of the option and its
+                # distance from n
+                w = centrality[optn] * math.exp(-d*distances[optn])
+                odds.append(w)
+    prof.count('bfs_calls')
+
+    # Select at random a new connection for n from the list of options given the assigned odds
+    with prof.timer('sampling'):
+        a = random.choices(nodes, weights=odds, k=1)[0]
+    graph.add_edge(node, a)
+    prof.count('random_picks')
+    prof.count('edges_added')
+    return a
+
+
+def equilibrium_round(G, nodes, initial_nbrs, d, p):
+    """
+    Runs one round of the prestige birth-death process on G in place and returns the number of iterations
+    made, one per node.
+
+    Parameters
+    ----------
+    G : Graph
+        Network being brought to equilibrium, a networkx graph or any graph_backend
+    nodes : list
+        Nodes of G
+    initial_nbrs : dict
+        Lists the initial neighbours for each node, which are never removed
+    d : float
+        Strength of the distance decay function
+    p : float
+        Probability of a node losing most of its edges at a given iteration
+    """
+    graph = as_backend(G)
+    for i in range(len(nodes)):
+        # Select random person
+        node = random.choice(nodes)
+        prof.count('random_picks')
+        _prestige_link(graph, node, nodes, d)
+
+        # Removal only has a p probability of occurring
+        if random.random() < p:
+            # count_remove_n += 1
+            with prof.timer('removal'):
+                # Select node for removal
+                rmv = random.choice(nodes)
+                # List all neighbours of the node being removed
+                nbrs = graph.neighbors(rmv)
+                num_nbrs = len(nbrs)
+                rmv_nbrs = set(nbrs)
+                to_add = []
+
+                for nbr in nbrs:
+                    # The 4 initial neighbours always stay connected
+                    if nbr in initial_nbrs[rmv]:
+                        to_add.append(nbr)
+                        # count_keep_e += 1
+                    else:
+                        # Every other connection is given a probability of maintaining their connection
+                        mutuals = rmv_nbrs.intersection(graph.neighbors(nbr))
+                        odd = ((len(mutuals) + 1) / num_nbrs)
+                        if random.random() < odd:
+                            to_add.append(nbr)
+
+                # Update the connections
+                for nbr in nbrs:
+                    graph.remove_edge(rmv, nbr)
+                for choice in to_add:
+                    graph.add_edge(rmv, choice)
+            prof.count('edges_removed', num_nbrs - len(to_add))
+
+    return len(nodes)
+
+
+def network_equilibrium(n, d, p, graph=False, clustering='exact'):
     """
     Returns a network with the same properties as a human social network, namely high clustering, low average shortest
     distance and a skewed degree distribution. This is achieved by applying an algorithm that makes new connections
@@ -89,7 +169,9 @@ def network_equilibrium(n, d, p, graph=False):
     p : float
         Probability of a node losing most of its edges at a given iteration
     graph : bool
-        Whether or not the a graph for the geodesics value at each round is printed
+        Whether or not a graph of the geodesic at each round is saved as graphs/<n>x<n> p=<p> d=<d> geodesic.png
+    clustering : str
+        Estimator of the clustering column, 'exact' or 'wedge' (see network_data.average_clustering)
 
     Notes
     -----
@@ -106,9 +188,8 @@ def network_equilibrium(n, d, p, graph=False):
         initial_nbrs[node] = nbrs
 
     nodes = list(G.nodes)
-    num_nodes = len(nodes)
 
-    with open(r'data\{0}x{0} p={1} d={2}.csv'.format(n, p, d), 'w', newline='') as file:
+    with open(os.path.join('data', '{0}x{0} p={1} d={2}.csv'.format(n, p, d)), 'w', newline='') as file:
 
         fields = ['iterations', 'edges', 'geodesic', 'clustering', 'movement', 'move_avg', 'avg_degree', 'degree_skew',
                   'alpha', 'KS', 'p_KS', 'alpha1', 'alpha2', 'switch', 'KS_double', 'p_KS_double']
@@ -118,16 +199,16 @@ def network_equilibrium(n, d, p, graph=False):
         start = {}
         start['iterations'] = 0
         start['edges'] = nx.number_of_edges(G)
-        geo = nx.average_shortest_path_length(G)
+        geo = average_shortest_path_length(G)
         start['geodesic'] = geo
-        start['clustering'] = nx.average_clustering(G)
+        start['clustering'] = average_clustering(G, clustering)
         start['movement'] = 'N/A'
         start['move_avg'] = 'N/A'
-        degrees = [G.degree(n) for n in nodes]
-        start['avg_degree'] = np.mean(degrees)
-        start['degree_skew'] = stats.skew(degrees)
+        summary = degree_summary(G)
+        start['avg_degree'] = summary.mean
+        start['degree_skew'] = summary.skew
 
-        alpha, ks, p_ks, alpha1, alpha2, switch, ks2, p_ks2 = ks_test(G)
+        alpha, ks, p_ks, alpha1, alpha2, switch, ks2, p_ks2 = ks_test(G, summary=summary)
         start['alpha'] = alpha
         start['KS'] = ks
         start['p_KS'] = p_ks
@@ -148,80 +229,32 @@ def network_equilibrium(n, d, p, graph=False):
         iterations = 0
 
         # Used to measure whether the network is in equilibrium
-        prev_geo = nx.average_shortest_path_length(G)
+        prev_geo = geo
         movement = []
 
         while in_a_row < 3:
-            for i in range(num_nodes):
-                iterations += 1
-
-                # Select random person
-                node = random.choice(nodes)
-                odds = []
-                centrality = nx.eigenvector_centrality_numpy(G)
-                nbrs = [nbr for nbr in G[node]]
-                nbrs.append(node)
-
-                for optn in nodes:
-                    if optn in nbrs:
-                        odds.append(0)
-                    else:
-                        dist = nx.shortest_path_length(G, node, optn)
-                        # Set the odds of being connected to based on eigenvector centrality of the option and its
-                        # distance from n
-                        w = centrality[optn] * math.exp(-d*dist)
-                        odds.append(w)
-
-                # Select at random a new connection for n from the list of options given the assigned odds
-                a = random.choices(nodes, weights=odds, k=1)[0]
-                G.add_edge(node, a)
-
-                # Removal only has a p probability of occurring
-                if random.random() < p:
-                    # count_remove_n += 1
-
-                    # Select node for removal
-                    rmv = random.choice(nodes)
-                    # List all neighbours of the node being removed
-                    nbrs = [nbr for nbr in G[rmv]]
-                    num_nbrs = len(nbrs)
-                    to_add = []
-
-                    for nbr in nbrs:
-                        # The 4 initial neighbours always stay connected
-                        if nbr in initial_nbrs[rmv]:
-                            to_add.append(nbr)
-                            # count_keep_e += 1
-                        else:
-                            # Every other connection is given a probability of maintaining their connection
-                            mutuals = list(nx.common_neighbors(G, rmv, nbr))
-                            odd = ((len(mutuals) + 1) / num_nbrs)
-                            if random.random() < odd:
-                                to_add.append(nbr)
-
-                    # Update the connections
-                    G.remove_node(rmv)
-                    G.add_node(rmv)
-                    for choice in to_add:
-                        G.add_edge(rmv, choice)
+            iterations += equilibrium_round(G, nodes, initial_nbrs, d, p)
 
             end_of_round = {}
             end_of_round['iterations'] = iterations
-            geo = nx.average_shortest_path_length(G)
-            end_of_round['edges'] = nx.number_of_edges(G)
-            end_of_round['geodesic'] = geo
-            end_of_round['clustering'] = nx.average_clustering(G)
+            with prof.timer('metrics'):
+                geo = average_shortest_path_length(G)
+                end_of_round['edges'] = nx.number_of_edges(G)
+                end_of_round['geodesic'] = geo
+                end_of_round['clustering'] = average_clustering(G, clustering)
             move = geo - prev_geo
             prev_geo = geo
             end_of_round['movement'] = move
-            degrees = [G.degree(node) for node in nodes]
-            end_of_round['avg_degree'] = np.mean(degrees)
-            end_of_round['degree_skew'] = stats.skew(degrees)
+            # Built once per round and shared with ks_test
+            summary = degree_summary(G)
+            end_of_round['avg_degree'] = summary.mean
+            end_of_round['degree_skew'] = summary.skew
             movement.append(move)
             check = np.mean(movement)
             end_of_round['move_avg'] = check
 
-            alpha, ks, p_ks, alpha1, alpha2, switch, ks2, p_ks2 = ks_test(G)
+            with prof.timer('metrics'):
+                alpha, ks, p_ks, alpha1, alpha2, switch, ks2, p_ks2 = ks_test(G, summary=summary)
             end_of_round['alpha'] = alpha
             end_of_round['KS'] = ks
             end_of_round['p_KS'] = p_ks
@@ -231,7 +264,8 @@ def network_equilibrium(n, d, p, graph=False):
             end_of_round['KS_double'] = ks2
             end_of_round['p_KS_double'] = p_ks2
 
-            writer.writerow(end_of_round)
+            with prof.timer('io'):
+                writer.writerow(end_of_round)
 
             x_vals.append(iterations)
             geos.append(geo)
@@ -242,17 +276,14 @@ def network_equilibrium(n, d, p, graph=False):
                 in_a_row = 0
 
     if graph:
-        plt.scatter(x_vals, geos, s=10)
-        plt.title("Geodesic Equilibrium")
-        plt.xlabel("# of Iterations")
-        plt.ylabel("Average Geodesic")
-        plt.axhline(3.4, c='black', lw=1)
-        plt.savefig(r'graphs\{0}x{0} p={1} d={2} geodesic.csv'.format(n, p, d))
-        plt.close()
+        from batch_render import render
+        render(os.path.join('graphs', '{0}x{0} p={1} d={2} geodesic'.format(n, p, d)), 'geodesic', (x_vals, geos))
 
     return G
 
 
 if __name__ == '__main__':
     args = parser.parse_args()
-    G = network_equilibrium(args.size, args.decay, args.birth_death_rate)
\ No newline at end of file
+    if args.profile:
+        prof.enable(args.profile)
+    G = network_equilibrium(args.size, args.decay, args.birth_death_rate, clustering=args.clustering)
\ No newline at end of file
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Streaming node-link JSON for large graphs.
+
+write_node_link writes the same document as json.dump(json_graph.node_link_data(G)), one node or link
+record at a time, so memory stays flat however many edges the graph has. Attribute columns (see
+graph_backend) are written out as node attributes straight from the arrays, without copying the graph.
+read_node_link parses such a file (or any node-link JSON, including ones written by networkx) record by
+record and adds each node and link to the graph as it goes, never holding the whole document.
+
+Files whose name ends in .gz are gzip compressed; the reader recognises gzip from the content. Both close
+their file before returning, also on errors.
+"""
+
+import gzip
+import json
+import warnings
+
+import networkx as nx
+from networkx.readwrite import json_graph
+
+from graph_backend import NODE_COLUMNS, VERSION
+
+# Records written per call to the file
+_BATCH = 1024
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _links_key():
+    """Key of the link records in the node-link data of the installed networkx ('links', or 'edges' from 3.6)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return 'edges' if 'edges' in json_graph.node_link_data(nx.Graph()) else 'links'
+
+
+def _open(filename, mode, compress):
+    if compress:
+        # Level 6 compresses these records almost as well as the default 9 in about half the time
+        return gzip.open(filename, mode + 't', compresslevel=6, encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+
+def _write_records(f, records):
+    """Writes records as the comma separated elements of a JSON array, _BATCH at a time"""
+    batch = []
+    first = True
+    for record in records:
+        batch.append(json.dumps(record))
+        if len(batch) == _BATCH:
+            f.write(('' if first else ', ') + ', '.join(batch))
+            first = False
+            batch = []
+    if batch:
+        f.write(('' if first else ', ') + ', '.join(batch))
+
+
+def write_node_link(filename, graph, compress=None):
+    """
+    Writes a networkx graph as node-link JSON, see the module docstring.
+
+    Parameters
+    ----------
+    filename : str
+        Output file
+    graph : Graph
+        networkx graph. Its attribute columns are written as node attributes, and the bookkeeping
+        graph_backend keeps in graph.graph (the columns and the mutation counter) is left out of the
+        graph attributes. Edge keys of a multigraph are written as the 'key' of each link, as
+        networkx does.
+    compress : bool
+        gzip the file, by default if filename ends in .gz
+    """
+    if compress is None:
+        compress = filename.endswith('.gz')
+    columns = graph.graph.get(NODE_COLUMNS, {})
+    attributes = {key: value for key, value in graph.graph.items() if key not in (NODE_COLUMNS, VERSION)}
+
+    def nodes():
+        for i, (node, data) in enumerate(graph.nodes(data=True)):
+            record = dict(data)
+            for name, values in columns.items():
+                record[name] = values[i].item()
+            record['id'] = node
+            yield record
+
+    def links():
+        if graph.is_multigraph():
+            edges = ((u, v, dict(data, key=key)) for u, v, key, data in graph.edges(keys=True, data=True))
+        else:
+            edges = graph.edges(data=True)
+        for u, v, data in edges:
+            record = dict(data)
+            record['source'] = u
+            record['target'] = v
+            yield record
+
+    with _open(filename, 'w', compress) as f:
+        f.write('{{"directed": {0}, "multigraph": {1}, "graph": {2}, "nodes": ['.format(
+            json.dumps(graph.is_directed()), json.dumps(graph.is_multigraph()), json.dumps(attributes)))
+        _write_records(f, nodes())
+        f.write('], "{0}": ['.format(_links_key()))
+        _write_records(f, links())
+        f.write(']}')
+
+
+class _Scanner:
+    """Incremental JSON tokens from a text file, decoding one value at a time from a sliding buffer"""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _more(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it, '' at the end"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected '{0}' in node-link JSON, found '{1}'".format(char, self.peek()))
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        """Yields the elements of the next JSON array"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+
+def _node_id(value):
+    """Node ids written from tuples come back as lists, turn them into tuples again as networkx does"""
+    return tuple(_node_id(x) for x in value) if isinstance(value, list) else value
+
+
+def _empty_graph(header):
+    directed = header.get('directed', False)
+    if header.get('multigraph', False):
+        graph = nx.MultiDiGraph() if directed else nx.MultiGraph()
+    else:
+        graph = nx.DiGraph() if directed else nx.Graph()
+    graph.graph.update(header.get('graph', {}))
+    return graph
+
+
+def read_node_link(filename):
+    """Returns the networkx graph stored in a node-link JSON file, gzipped or not, see the module docstring"""
+    with open(filename, 'rb') as f:
+        compress = f.read(2) == _GZIP_MAGIC
+    with _open(filename, 'r', compress) as f:
+        scanner = _Scanner(f)
+        header = {}
+        graph = None
+        scanner.expect('{')
+        while scanner.peek() != '}':
+            key = scanner.value()
+            scanner.expect(':')
+            if key in ('nodes', 'links', 'edges'):
+                if graph is None:
+                    graph = _empty_graph(header)
+                for record in scanner.array():
+                    if key == 'nodes':
+                        graph.add_node(_node_id(record.pop('id')), **record)
+                    elif graph.is_multigraph():
+                        graph.add_edge(_node_id(record.pop('source')), _node_id(record.pop('target')),
+                                       key=record.pop('key', None), **record)
+                    else:
+                        graph.add_edge(_node_id(record.pop('source')), _node_id(record.pop('target')), **record)
+            else:
+                header[key] = scanner.value()
+            if scanner.peek() == ',':
+                scanner.pos += 1
+        scanner.expect('}')
+    return graph if graph is not None else _empty_graph(header)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Online aggregation of DSIT replicates.
+
+Instead of keeping every replicate and averaging later, the final 0:1 distribution and gen of each replicate
+are folded into running statistics as it ends: mean and variance by Welford's update and quantiles by the
+P-square sketch (Jain and Chlamtac 1985), both in constant memory. With a target width, simulate stops
+launching replicates once the confidence interval of the mean 0:1 distribution is narrower than the target,
+so cells that settle quickly use far fewer runs than the -i worst case.
+"""
+
+import bisect
+import csv
+import math
+
+import numpy as np
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile from five markers, updated by the P-square algorithm"""
+
+    def __init__(self, p):
+        self.p = p
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self._heights
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        n = self._positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                                                             (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        """Current estimate, exact while fewer than five values were added"""
+        if not self._heights:
+            return float('nan')
+        if len(self._heights) < 5:
+            return float(np.quantile(self._heights, self.p))
+        return self._heights[2]
+
+
+class RunningStats:
+    """Count, mean and variance (Welford) plus quantile sketches of a stream of values"""
+
+    def __init__(self, quantiles=QUANTILES):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.sketches = [P2Quantile(p) for p in quantiles]
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        for sketch in self.sketches:
+            sketch.add(x)
+
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    def half_width(self, confidence=0.95):
+        """Half width of the Student t confidence interval of the mean, inf with fewer than two values"""
+        if self.count < 2:
+            return float('inf')
+        from scipy import stats
+        return float(stats.t.ppf((1 + confidence) / 2, self.count - 1) * math.sqrt(self.variance() / self.count))
+
+    def row(self, name, confidence=0.95):
+        """Returns the statistics as CSV fields prefixed with name"""
+        data = {name + '_mean': self.mean, name + '_sd': math.sqrt(self.variance()) if self.count > 1 else '',
+                name + '_ci': self.half_width(confidence)}
+        for sketch in self.sketches:
+            data['{0}_q{1:02d}'.format(name, int(round(sketch.p * 100)))] = sketch.value()
+        return data
+
+
+class ReplicateAggregator:
+    """
+    Running statistics of the final 0:1 distribution and gen of the replicates of one simulate call.
+
+    Parameters
+    ----------
+    target_width : float
+        Replicates are no longer needed once the confidence interval of the mean 0:1 distribution is
+        narrower than this (full width). None never stops early.
+    confidence : float
+        Confidence level of the interval
+    min_replicates : int
+        Replicates always run before stopping, so the variance estimate is not taken from a handful
+    """
+
+    def __init__(self, target_width=None, confidence=0.95, min_replicates=5, quantiles=QUANTILES):
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_replicates = min_replicates
+        self.distribution = RunningStats(quantiles)
+        self.gen = RunningStats(quantiles)
+
+    def add(self, distribution, gen):
+        self.distribution.add(distribution)
+        self.gen.add(gen)
+
+    def done(self):
+        """Whether the interval of the mean 0:1 distribution is within the target width"""
+        return (self.target_width is not None and self.distribution.count >= self.min_replicates and
+                2 * self.distribution.half_width(self.confidence) <= self.target_width)
+
+    def row(self):
+        data = {'replicates': self.distribution.count, 'confidence': self.confidence}
+        data.update(self.distribution.row('distribution', self.confidence))
+        data.update(self.gen.row('gen', self.confidence))
+        return data
+
+    def write(self, fileName):
+        """Writes the statistics as a one row CSV file"""
+        data = self.row()
+        with open(fileName, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(data))
+            writer.writeheader()
+            writer.writerow(data)
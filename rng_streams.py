@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Block-buffered random streams for the scalar hot loops.
+
+A scalar draw from a NumPy RandomState or Generator costs around a microsecond of call overhead, and the
+DSIT pick loop makes two per pick. BlockStream draws uniforms from a numpy.random.Generator in large
+blocks, keeps the current block as a Python list and hands the values out one at a time. Bulk draws
+are sliced from the same block kept as an array. Integers and choices are taken from the same
+uniforms (floor(u * n)).
+
+Every value, scalar or bulk, comes from the one sequence of uniforms of the Generator, in order, so a
+stream depends only on its seed and the calls made, never on the block size. A stream's position (the
+number of uniforms used so far) together with its seed identifies any point of a run. replay(position)
+returns a stream that continues from there exactly, advancing the PCG64 state without regenerating
+the draws before it.
+
+BlockStream offers the parts of the RandomState (randint, random_sample) and random module (random,
+choice) interfaces used by the engines, so it can be passed wherever they take rng.
+"""
+
+import numpy as np
+
+
+class BlockStream:
+    """
+    Per-run stream of random values, see the module docstring.
+
+    Parameters
+    ----------
+    seed : int, sequence or SeedSequence
+        Seed of the stream, OS entropy if None
+    block_size : int
+        Uniforms drawn per refill
+    position : int
+        Number of uniforms to skip, see replay
+    """
+
+    def __init__(self, seed=None, block_size=1 << 16, position=0):
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        bit_generator = np.random.PCG64(self.seed)
+        if position:
+            bit_generator.advance(position)
+        self._generator = np.random.Generator(bit_generator)
+        self.block_size = block_size
+        self._block = []
+        self._array = np.empty(0)
+        self._next = 0
+        # Position in the stream of the first value of the current block
+        self._start = position
+
+    @property
+    def position(self):
+        """Number of uniforms used so far"""
+        return self._start + self._next
+
+    def replay(self, position=0):
+        """Returns a new stream with the same seed that continues exactly from position"""
+        return BlockStream(self.seed, self.block_size, position)
+
+    def _refill(self):
+        self._start += len(self._block)
+        self._array = self._generator.random(self.block_size)
+        self._block = self._array.tolist()
+        self._next = 0
+
+    def _take(self, count):
+        """Returns the next count uniforms as a new array, concatenated from slices of the blocks"""
+        parts = []
+        while count > 0:
+            if self._next == len(self._block):
+                self._refill()
+            part = self._array[self._next:self._next + count]
+            self._next += len(part)
+            count -= len(part)
+            parts.append(part)
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def random(self):
+        """Next uniform in [0, 1)"""
+        if self._next == len(self._block):
+            self._refill()
+        value = self._block[self._next]
+        self._next += 1
+        return value
+
+    def random_sample(self, size=None):
+        """Uniforms in [0, 1): one float, or an array of the given shape"""
+        if size is None:
+            return self.random()
+        return self._take(int(np.prod(size))).reshape(size)
+
+    def randint(self, low, high=None, size=None):
+        """Integers in [low, high), or [0, low) without high: one int, or an array of the given shape"""
+        if high is None:
+            low, high = 0, low
+        if size is None:
+            if self._next == len(self._block):
+                self._refill()
+            value = self._block[self._next]
+            self._next += 1
+            return low + int(value * (high - low))
+        return low + np.floor(self.random_sample(size) * (high - low)).astype(np.int64)
+
+    def choice(self, seq):
+        """Random element of a non-empty sequence"""
+        return seq[int(self.random() * len(seq))]
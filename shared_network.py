@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Network topology and traits in shared memory for multiprocess simulation workers.
+
+The CSR adjacency (indptr, indices) and the trait columns (extraversion, conformity) are kept in
+multiprocessing.shared_memory blocks. Workers receive only the small picklable handle and attach to the
+blocks zero-copy, instead of unpickling and keeping their own copy of a networkx graph.
+"""
+
+import itertools
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from graph_backend import as_backend
+
+_FIELDS = (('indptr', np.int64), ('indices', np.int32), ('extraversion', np.float64),
+           ('conformity', np.float64))
+
+# Networks already attached in this process, keyed by handle, so repeated tasks reuse them
+_attached = {}
+
+
+class SharedNetwork:
+    """
+    Shared-memory CSR network. Create one with SharedNetwork.create or SharedNetwork.from_graph in the
+    parent, pass .handle to the workers and call SharedNetwork.attach(handle) there.
+
+    Node positions are the node labels, as in the integer-labelled networks of the generators. The
+    generators grow a networkx graph, whose adjacency is only final once they return, so their networks
+    are published afterwards with from_graph in one pass over the adjacency.
+    """
+
+    def __init__(self, handle, blocks):
+        self.handle = handle
+        self.blocks = blocks
+        self.arrays = {}
+        for (field, dtype), (name, length) in zip(_FIELDS, handle):
+            self.arrays[field] = np.ndarray((length,), dtype=dtype, buffer=blocks[field].buf)
+
+    @classmethod
+    def allocate(cls, num_nodes, num_entries):
+        """Returns a new, unfilled SharedNetwork for num_nodes nodes and num_entries adjacency entries"""
+        lengths = {'indptr': num_nodes + 1, 'indices': num_entries, 'extraversion': num_nodes,
+                   'conformity': num_nodes}
+        blocks = {}
+        handle = []
+        for field, dtype in _FIELDS:
+            size = max(lengths[field] * np.dtype(dtype).itemsize, 1)
+            blocks[field] = shared_memory.SharedMemory(create=True, size=size)
+            handle.append((blocks[field].name, lengths[field]))
+        return cls(tuple(handle), blocks)
+
+    @classmethod
+    def create(cls, indptr, indices, extraversion, conformity):
+        """Returns a SharedNetwork holding copies of the inputted CSR arrays and trait columns"""
+        shared = cls.allocate(len(indptr) - 1, len(indices))
+        shared.arrays['indptr'][:] = indptr
+        shared.arrays['indices'][:] = indices
+        shared.arrays['extraversion'][:] = extraversion
+        shared.arrays['conformity'][:] = conformity
+        return shared
+
+    @classmethod
+    def from_graph(cls, G):
+        """
+        Publishes a networkx graph with nodes labelled 0..n-1, raising ValueError for any other labels.
+        Neighbours keep the order networkx reports, as in dsit_engine.network_arrays, so initializers
+        that walk neighbours behave the same on the shared network.
+        """
+        num_nodes = G.number_of_nodes()
+        if set(G.nodes()) != set(range(num_nodes)):
+            raise ValueError("SharedNetwork.from_graph needs nodes labelled 0..n-1, "
+                             "see networkx.convert_node_labels_to_integers")
+        shared = cls.allocate(num_nodes, 2 * G.number_of_edges())
+        graph = as_backend(G)
+        # Columns are in G.nodes() order, the blocks are indexed by label
+        order = np.fromiter(G.nodes(), dtype=np.int64, count=num_nodes)
+        shared.arrays['extraversion'][order] = graph.attribute('extraversion')
+        shared.arrays['conformity'][order] = graph.attribute('conformity')
+        adjacency = G.adj
+        degree = np.fromiter((len(adjacency[node]) for node in range(num_nodes)), dtype=np.int64, count=num_nodes)
+        shared.arrays['indptr'][0] = 0
+        np.cumsum(degree, out=shared.arrays['indptr'][1:])
+        shared.arrays['indices'][:] = np.fromiter(
+            itertools.chain.from_iterable(adjacency[node] for node in range(num_nodes)), dtype=np.int32,
+            count=len(shared.arrays['indices']))
+        return shared
+
+    @classmethod
+    def attach(cls, handle):
+        """Attaches to the shared blocks described by handle. Reuses an earlier attachment in this process."""
+        if handle not in _attached:
+            blocks = {}
+            for (field, dtype), (name, length) in zip(_FIELDS, handle):
+                blocks[field] = shared_memory.SharedMemory(name=name)
+            _attached[handle] = cls(handle, blocks)
+        return _attached[handle]
+
+    def network(self):
+        """Returns a DSITNetwork whose arrays are views of the shared blocks"""
+        from dsit_engine import DSITNetwork
+        arrays = self.arrays
+        return DSITNetwork(range(len(arrays['extraversion'])), arrays['indptr'], arrays['indices'],
+                           arrays['extraversion'], arrays['conformity'])
+
+    def close(self):
+        """Detaches this process from the shared blocks"""
+        self.arrays = {}
+        _attached.pop(self.handle, None)
+        for block in self.blocks.values():
+            block.close()
+
+    def unlink(self):
+        """Frees the shared blocks. Call once, from the process that created them, after close."""
+        for block in self.blocks.values():
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Only meant for the creating process
+        self.close()
+        self.unlink()
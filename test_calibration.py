@@ -0,0 +1,14 @@
+import random
+
+import calibration
+
+
+def test_pilots_reproducible_and_leave_random_state():
+    random.seed(5)
+    state = random.getstate()
+    curve = calibration.migration_curve(6, 3, (4, 4), seed=1)
+    assert random.getstate() == state
+    assert calibration.migration_curve(6, 3, (4, 4), seed=1) == curve
+    pilot = calibration.prestige_pilot(6, 4, 0.5, 2, seed=1)
+    assert random.getstate() == state
+    assert calibration.prestige_pilot(6, 4, 0.5, 2, seed=1) == pilot
@@ -0,0 +1,31 @@
+import numpy as np
+
+import common_random_numbers as crn
+
+
+def _uniforms(seed, num_nodes):
+    return np.random.RandomState([seed, 2]).random_sample((2, num_nodes))
+
+
+def test_same_extraversion_shares_network():
+    uniforms = _uniforms(7, 36)
+    base = crn.condition_network((6, 6), 4, 0, 0, 7, uniforms)
+    other = crn.condition_network((6, 6), 4, 0, 1, 7, uniforms)
+    assert np.array_equal(base.indptr, other.indptr) and np.array_equal(base.indices, other.indices)
+    assert np.array_equal(base.extraversion, other.extraversion)
+    # Conformity keeps each node's rank whatever the skew
+    assert np.array_equal(np.argsort(base.conformity), np.argsort(other.conformity))
+
+
+def test_runs_reproducible():
+    net = crn.condition_network((6, 6), 4, 0, 0, 3, _uniforms(3, 36))
+    assert crn.run_condition(net, 0, 3) == crn.run_condition(net, 0, 3)
+    assert crn.run_condition(net, 0, 3, 'consolidation') == crn.run_condition(net, 0, 3, 'consolidation')
+
+
+def test_sweep_reproducible():
+    conditions = [(0, 0, 0), (0, 1, 0), (1, 0, 2)]
+    results = crn.paired_sweep(conditions, 2, (6, 6), 3, seed=5)
+    assert np.array_equal(results, crn.paired_sweep(conditions, 2, (6, 6), 3, seed=5))
+    rows = crn.paired_differences(results, conditions)
+    assert len(rows) == 4 and rows[0]['condition'] == '0,1,0'
@@ -0,0 +1,135 @@
+import networkx as nx
+import numpy as np
+
+import dsit_engine as dsit
+from graph_backend import set_column
+
+
+def _network(seed=0, size=8):
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(size, size, True))
+    G.add_edges_from([(0, 9), (3, 40), (17, 50)])
+    rng = np.random.RandomState(seed)
+    set_column(G, 'extraversion', rng.beta(4, 4, len(G)))
+    set_column(G, 'conformity', rng.beta(4, 4, len(G)))
+    return G
+
+
+def _original_run(G, values, conformity, rng, threshold=0.5):
+    """The pick loop of the original simulation scripts, on networkx neighbour lists"""
+    values = list(values)
+    nodes = list(G.nodes())
+    numNodes = len(nodes)
+    nStayedSame = 0
+    count = 0
+    converted = float(values.count(0)) / numNodes
+    while nStayedSame < 2 * numNodes and converted > threshold:
+        count = count + 1
+        node = rng.choice(nodes)
+        sameTally = sum(1 for nbr in G.neighbors(node) if values[nbr] == values[node])
+        diffTally = G.degree(node) - sameTally
+        if rng.random() < conformity[node] * diffTally / (sameTally + diffTally):
+            values[node] = 1 - values[node]
+            nStayedSame = 0
+        else:
+            nStayedSame = nStayedSame + 1
+        converted = float(values.count(0)) / numNodes
+    return values, count
+
+
+def test_run_dsit_matches_original_loop():
+    G = _network()
+    net = dsit.network_arrays(G)
+    conformity = net.conformity.tolist()
+    for seed in range(5):
+        start = np.random.RandomState(100 + seed).randint(2, size=len(G)).tolist()
+        expected = _original_run(G, start, conformity, np.random.RandomState(seed), threshold=0.0)
+        values = list(start)
+        count = dsit.run_dsit(net, values, conformity, dsit.linear_rule,
+                              [dsit.stability_window(), dsit.conversion_threshold(0.0)],
+                              np.random.RandomState(seed))
+        assert (values, count) == expected
+
+
+def test_run_dsit_matches_original_diffusion():
+    G = _network(1)
+    net = dsit.network_arrays(G)
+    conformity = net.conformity.tolist()
+    jesus = int(np.argmax(net.extraversion))
+    conformity[jesus] = 0
+    start = [0] * len(G)
+    start[jesus] = 1
+    for seed in range(5):
+        expected = _original_run(G, start, conformity, np.random.RandomState(seed))
+        values = list(start)
+        count = dsit.run_dsit(net, values, conformity, dsit.linear_rule,
+                              [dsit.stability_window(), dsit.conversion_threshold(0.5)],
+                              np.random.RandomState(seed))
+        assert (values, count) == expected
+
+
+def test_tally_table_holds_rule():
+    for rule in (dsit.linear_rule, dsit.power_rule(2), dsit.power_rule(-1), dsit.power_rule(0.5)):
+        table = dsit.tally_table(rule, 6)
+        for same in range(7):
+            for diff in range(7 - same):
+                expected = rule(same, diff) if same + diff else 0
+                assert table[same, diff] == expected
+
+
+def test_power_rule_matches_formula():
+    for p in (-1, -0.5, 0.5, 2):
+        rule = dsit.power_rule(p)
+        assert rule(3, 2) == 2 ** p / (3 ** p + 2 ** p)
+        # Nothing to conform to
+        assert rule(4, 0) == 0
+    assert dsit.power_rule(2)(0, 3) == 1
+    assert dsit.power_rule(-1)(0, 3) == 0
+
+
+def test_negative_power_runs_end():
+    net = dsit.network_arrays(_network(2))
+    conformity = net.conformity.tolist()
+    # Nobody holds the other value, so nobody changes
+    values = [1] * len(net.nodes)
+    count = dsit.run_dsit(net, values, conformity, dsit.power_rule(-1), [dsit.stability_window()],
+                          np.random.RandomState(0))
+    assert values == [1] * len(net.nodes) and count == 2 * len(net.nodes)
+    values = np.random.RandomState(1).randint(2, size=len(net.nodes)).tolist()
+    count = dsit.run_dsit(net, values, conformity, dsit.power_rule(-1),
+                          [dsit.stability_window(), dsit.step_limit(5000)], np.random.RandomState(1))
+    assert count <= 5000
+
+
+def _synchronous_loop(G, values, conformity, rng):
+    """Every node weighs the values of the previous generation, in plain loops"""
+    values = list(values)
+    numNodes = len(values)
+    nStayedSame = 0
+    count = 0
+    while nStayedSame < 2 * numNodes:
+        count = count + numNodes
+        draws = rng.random_sample(numNodes)
+        new_values = list(values)
+        for node in range(numNodes):
+            diffTally = sum(1 for nbr in G.neighbors(node) if values[nbr] != values[node])
+            if draws[node] < conformity[node] * diffTally / G.degree(node):
+                new_values[node] = 1 - values[node]
+        if new_values == values:
+            nStayedSame = nStayedSame + numNodes
+        else:
+            nStayedSame = 0
+        values = new_values
+    return values, count
+
+
+def test_synchronous_matches_plain_loop():
+    G = _network(3)
+    net = dsit.network_arrays(G)
+    conformity = net.conformity.tolist()
+    for seed in range(3):
+        start = np.random.RandomState(200 + seed).randint(2, size=len(G)).tolist()
+        expected = _synchronous_loop(G, start, conformity, np.random.RandomState(seed))
+        values = list(start)
+        count = dsit.run_dsit_synchronous(net, values, conformity, dsit.linear_rule, [dsit.stability_window()],
+                                          np.random.RandomState(seed))
+        assert (values, count) == expected
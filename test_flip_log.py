@@ -0,0 +1,52 @@
+import networkx as nx
+import numpy as np
+
+import dsit_engine as dsit
+from flip_log import FlipLog
+from graph_backend import set_column
+
+
+def _run(synchronous=False):
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(7, 7, True))
+    set_column(G, 'extraversion', np.linspace(0, 1, len(G)))
+    set_column(G, 'conformity', np.full(len(G), 0.8))
+    net = dsit.network_arrays(G)
+    start = np.random.RandomState(0).randint(2, size=len(G)).tolist()
+    values = list(start)
+    states = {}
+
+    def on_step(count, zeros):
+        states[count] = (list(values), zeros)
+
+    log = FlipLog(start)
+    run = dsit.run_dsit_synchronous if synchronous else dsit.run_dsit
+    count = run(net, values, net.conformity.tolist(), dsit.linear_rule, None, np.random.RandomState(1), on_step,
+                None, log)
+    return log, start, values, states, count
+
+
+def test_replay_gives_every_state():
+    for synchronous in (False, True):
+        log, start, values, states, count = _run(synchronous)
+        assert log.state_at(0).tolist() == start
+        for step, (state, zeros) in states.items():
+            assert log.state_at(step).tolist() == state
+        assert log.state_at(count).tolist() == values
+        assert log.steps == count
+
+
+def test_zero_to_one_follows_run():
+    log, start, values, states, count = _run()
+    steps, distribution = log.zero_to_one()
+    for step, (state, zeros) in states.items():
+        k = np.searchsorted(steps, step, side='right') - 1
+        assert distribution[k] == zeros / len(start)
+
+
+def test_save_and_load(tmp_path):
+    log, start, values, states, count = _run()
+    log.save(str(tmp_path / 'flips.npz'))
+    loaded = FlipLog.load(str(tmp_path / 'flips.npz'))
+    assert loaded.steps == log.steps
+    assert np.array_equal(loaded.events[:loaded.size], log.events[:log.size])
+    assert loaded.state_at(count).tolist() == values
@@ -0,0 +1,82 @@
+import networkx as nx
+import pytest
+
+import graph_backend
+import instrumentation as prof
+from graph_backend import (NODE_COLUMNS, ArrayGraph, as_backend, average_shortest_path_length,
+                           eigenvector_centrality, set_column)
+
+
+def _ring(n=12):
+    return nx.cycle_graph(n)
+
+
+def test_cache_follows_networkx_edits():
+    G = _ring()
+    before = average_shortest_path_length(G)
+    G.add_edge(0, 6)
+    assert average_shortest_path_length(G) == nx.average_shortest_path_length(G) < before
+
+
+def test_cache_follows_degree_preserving_edits():
+    G = nx.cycle_graph(8)
+    G.add_edges_from([(0, 4), (2, 6)])
+    before = average_shortest_path_length(G)
+    # Same degree sequence and edge count, different graph
+    G.remove_edges_from([(0, 4), (2, 6)])
+    G.add_edges_from([(0, 2), (4, 6)])
+    assert average_shortest_path_length(G) == nx.average_shortest_path_length(G) != before
+
+
+def test_cache_reused_until_backend_edit():
+    graph = as_backend(_ring())
+    centrality = eigenvector_centrality(graph)
+    assert eigenvector_centrality(graph) is centrality
+    graph.add_edge(0, 6)
+    assert eigenvector_centrality(graph) is not centrality
+    array = ArrayGraph.from_graph(_ring())
+    before = average_shortest_path_length(array)
+    array.add_edge(0, 6)
+    assert average_shortest_path_length(array) < before
+
+
+def test_set_column_on_copy_leaves_original():
+    G = _ring()
+    set_column(G, 'conformity', range(12))
+    H = G.copy()
+    set_column(H, 'conformity', [0.5] * 12)
+    set_column(H, 'extraversion', [0.5] * 12)
+    assert as_backend(G).attribute('conformity').tolist() == list(range(12))
+    assert 'extraversion' not in G.graph[NODE_COLUMNS]
+
+
+def test_geodesic_counted_once_per_state():
+    prof.reset()
+    prof.ENABLED = True
+    try:
+        G = _ring()
+        average_shortest_path_length(G)
+        average_shortest_path_length(G)
+        assert prof.summary()['counters']['bfs_calls'] == 12
+        G.add_edge(0, 6)
+        average_shortest_path_length(G)
+        assert prof.summary()['counters']['bfs_calls'] == 24
+    finally:
+        prof.ENABLED = False
+        prof.reset()
+
+
+def test_array_geodesic_in_chunks(monkeypatch):
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(5, 7, True))
+    G.add_edges_from([(0, 17), (3, 30)])
+    # A handful of sources per chunk, and a last chunk that is not full
+    monkeypatch.setattr(graph_backend, '_PATH_CHUNK', 4 * len(G))
+    assert ArrayGraph.from_graph(G).average_shortest_path_length() == pytest.approx(
+        nx.average_shortest_path_length(G))
+
+
+def test_self_loops_rejected():
+    for graph in (as_backend(_ring()), ArrayGraph.from_graph(_ring())):
+        with pytest.raises(ValueError):
+            graph.add_edge(3, 3)
+        assert graph.number_of_edges() == 12
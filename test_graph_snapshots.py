@@ -0,0 +1,52 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import dsit_engine as dsit
+from graph_backend import set_column
+from graph_snapshots import SnapshotWriter, encode_nodes, read_snapshots, snapshot_graph
+from network_bank import read_graph, write_network
+
+
+def _grid():
+    G = nx.grid_2d_graph(4, 5)
+    set_column(G, 'extraversion', np.linspace(0, 1, len(G)))
+    set_column(G, 'conformity', np.linspace(1, 0, len(G)))
+    return G
+
+
+def test_snapshot_keeps_tuple_labels(tmp_path):
+    G = _grid()
+    net = dsit.network_arrays(G)
+    values = [i % 2 for i in range(len(G))]
+    with SnapshotWriter(str(tmp_path / 'run'), net) as writer:
+        writer.write(0, 0, values)
+    stored, snapshots = read_snapshots(str(tmp_path / 'run'))
+    assert stored.nodes == list(G.nodes())
+    g = snapshot_graph(stored, *next(snapshots)[2:])
+    assert set(g.edges()) == set(G.edges())
+    assert [g.nodes[node]['value'] for node in G] == values
+
+
+def test_bank_keeps_tuple_labels(tmp_path):
+    G = _grid()
+    write_network(str(tmp_path), 'grid', G)
+    g = read_graph(str(tmp_path), 'grid')
+    assert list(g.nodes()) == list(G.nodes())
+    assert set(map(frozenset, g.edges())) == set(map(frozenset, G.edges()))
+
+
+def test_unstorable_labels_rejected():
+    with pytest.raises(ValueError):
+        encode_nodes([object()])
+
+
+def test_bank_replaces_network(tmp_path):
+    write_network(str(tmp_path), 'grid', _grid())
+    G = nx.convert_node_labels_to_integers(nx.cycle_graph(6))
+    set_column(G, 'extraversion', [0.5] * 6)
+    set_column(G, 'conformity', [0.5] * 6)
+    write_network(str(tmp_path), 'grid', G)
+    assert set(read_graph(str(tmp_path), 'grid').edges()) == set(G.edges())
+    # Neither the staging nor the replaced directory is left behind
+    assert [path.name for path in tmp_path.iterdir()] == ['grid']
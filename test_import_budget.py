@@ -0,0 +1,11 @@
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_simulation_modules_within_import_budget():
+    result = subprocess.run([sys.executable, os.path.join(HERE, 'import_budget.py')], cwd=HERE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,74 @@
+import networkx as nx
+import numpy as np
+
+import dsit_engine as dsit
+import initial_conditions
+from graph_backend import set_column
+
+
+def _network():
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(6, 7, True))
+    G.add_edges_from([(0, 20), (5, 33), (5, 12), (5, 30)])
+    set_column(G, 'extraversion', np.random.RandomState(0).beta(4, 4, len(G)))
+    set_column(G, 'conformity', np.full(len(G), 0.5))
+    return G
+
+
+def _original_homophilous(G, rng, fraction=0.5):
+    """The seeding loop of the original homophily scripts"""
+    nodes = list(G.nodes())
+    values = dict.fromkeys(nodes, 0)
+    counter = 0
+    target = len(nodes) * fraction
+    while counter < target:
+        node = rng.choice(nodes)
+        if values[node] == 0:
+            values[node] = 1
+            counter = counter + 1
+        for friend in G.neighbors(node):
+            if values[friend] == 0:
+                values[friend] = 1
+                counter = counter + 1
+                if counter >= target:
+                    break
+    return [values[node] for node in nodes]
+
+
+def test_homophilous_single_replicate_matches_loop():
+    G = _network()
+    net = dsit.network_arrays(G)
+    for seed in range(20):
+        batch = initial_conditions.homophilous_batch(net, 1, np.random.RandomState(seed))
+        assert batch[0].tolist() == _original_homophilous(G, np.random.RandomState(seed))
+
+
+def test_homophilous_batch_matches_loop_distribution():
+    G = _network()
+    net = dsit.network_arrays(G)
+    replicates = 2000
+    batch = initial_conditions.homophilous_batch(net, replicates, np.random.RandomState(1))
+    rng = np.random.RandomState(2)
+    looped = np.array([_original_homophilous(G, rng) for i in range(replicates)])
+    assert set(batch.sum(axis=1)) <= {21, 22}
+    assert np.abs(batch.mean(axis=0) - looped.mean(axis=0)).max() < 0.06
+    assert abs(batch.sum(axis=1).mean() - looped.sum(axis=1).mean()) < 0.05
+
+
+def test_disciples_are_uniform_friends_of_jesus():
+    G = _network()
+    net = dsit.network_arrays(G)
+    jesus = initial_conditions.jesus_seed(net)
+    # The original scripts kept the first node of the largest extraversion
+    expected = 0
+    for node, extraversion in enumerate(net.extraversion):
+        if extraversion > net.extraversion[expected]:
+            expected = node
+    assert jesus == expected
+    friends = list(G.neighbors(jesus))
+    batch = initial_conditions.disciples_batch(net, 3000, np.random.RandomState(3), jesus, 2)
+    assert (batch[:, jesus] == 1).all()
+    assert (batch.sum(axis=1) == 3).all()
+    assert batch[:, friends].sum(axis=1).tolist() == [2] * 3000
+    assert np.abs(batch[:, friends].mean(axis=0) - 2 / len(friends)).max() < 0.04
+    everyone = initial_conditions.disciples_batch(net, 4, np.random.RandomState(3), jesus, len(friends))
+    assert (everyone[:, friends] == 1).all()
@@ -0,0 +1,47 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import network_data
+from graph_backend import ArrayGraph
+
+
+def _graph():
+    return nx.barabasi_albert_graph(300, 3, seed=1)
+
+
+def test_degree_summary_follows_networkx_edits():
+    G = _graph()
+    before = network_data.degree_summary(G)
+    fit = network_data.ks_test(G)
+    G.add_edges_from((0, node) for node in range(100, 200))
+    after = network_data.degree_summary(G)
+    assert after.mean == 2 * G.number_of_edges() / len(G) > before.mean
+    assert np.array_equal(after.degrees, [d for n, d in G.degree()])
+    assert network_data.ks_test(G) != fit
+
+
+def test_clustering_follows_networkx_edits():
+    G = _graph()
+    network_data.average_clustering(G)
+    G.add_edges_from((1, node) for node in list(G[0]) if node != 1)
+    assert network_data.average_clustering(G) == pytest.approx(nx.average_clustering(G))
+
+
+def test_array_graph_summary_follows_edits():
+    graph = ArrayGraph.from_graph(_graph())
+    before = network_data.degree_summary(graph)
+    assert network_data.degree_summary(graph) is before
+    graph.add_edge(0, next(node for node in graph.nodes() if not graph.has_edge(0, node) and node != 0))
+    assert network_data.degree_summary(graph).mean > before.mean
+
+
+def test_wedge_estimates_within_epsilon():
+    graph = ArrayGraph.from_graph(nx.powerlaw_cluster_graph(400, 4, 0.6, seed=2))
+    rng = np.random.RandomState(0)
+    for measure in (network_data.average_clustering, network_data.global_clustering):
+        exact = measure(graph)
+        assert abs(measure(graph, 'wedge', epsilon=0.02, rng=rng) - exact) < 0.02
+    # The sorted edge keys are built once for the unchanged graph
+    keys = network_data._node_edge_keys(graph, *network_data.adjacency_arrays(graph))
+    assert network_data._node_edge_keys(graph, *network_data.adjacency_arrays(graph)) is keys
@@ -0,0 +1,40 @@
+import gzip
+import json
+
+import networkx as nx
+import numpy as np
+from networkx.readwrite import json_graph
+
+from graph_backend import NODE_COLUMNS, VERSION, as_backend, set_column
+from node_link_stream import read_node_link, write_node_link
+
+
+def test_round_trip_writes_columns_not_bookkeeping(tmp_path):
+    G = nx.grid_2d_graph(3, 4)
+    G.graph['name'] = 'grid'
+    set_column(G, 'conformity', np.linspace(0, 1, len(G)))
+    as_backend(G).add_edge((0, 0), (2, 3))
+    filename = str(tmp_path / 'grid.json.gz')
+    write_node_link(filename, G)
+    with gzip.open(filename, 'rt') as f:
+        header = json.load(f)['graph']
+    assert header == {'name': 'grid'} and VERSION not in header and NODE_COLUMNS not in header
+    g = read_node_link(filename)
+    assert list(g.nodes()) == list(G.nodes())
+    assert set(map(frozenset, g.edges())) == set(map(frozenset, G.edges()))
+    assert [g.nodes[node]['conformity'] for node in g] == np.linspace(0, 1, len(G)).tolist()
+
+
+def test_multigraph_keys_survive(tmp_path):
+    G = nx.MultiGraph()
+    G.add_edge(0, 1, key='a', weight=1)
+    G.add_edge(0, 1, key='b', weight=2)
+    G.add_edge(1, 2)
+    filename = str(tmp_path / 'multi.json')
+    write_node_link(filename, G)
+    with open(filename) as f:
+        expected = nx.MultiGraph(json_graph.node_link_graph(json.load(f)))
+    g = read_node_link(filename)
+    assert g.is_multigraph()
+    assert sorted(g.edges(keys=True, data=True), key=str) == sorted(G.edges(keys=True, data=True), key=str)
+    assert sorted(expected.edges(keys=True), key=str) == sorted(G.edges(keys=True), key=str)
@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import dsit_engine as dsit
+import opinion_metrics
+from flip_log import FlipLog
+from graph_backend import set_column
+
+
+def _network(seed=0):
+    G = nx.gnm_random_graph(120, 300, seed=seed)
+    set_column(G, 'extraversion', np.zeros(len(G)))
+    set_column(G, 'conformity', np.full(len(G), 0.7))
+    return G
+
+
+def _similarity(G, values):
+    shares = [sum(values[nbr] == values[node] for nbr in G[node]) / G.degree(node) for node in G if G.degree(node)]
+    return np.mean(shares)
+
+
+def _clumps(G, values):
+    same = G.edge_subgraph((u, v) for u, v in G.edges() if values[u] == values[v])
+    sizes = [len(c) for c in nx.connected_components(same)]
+    # Nodes without a same-value neighbour are clumps of one
+    return sorted(sizes + [1] * (len(G) - same.number_of_nodes()))
+
+
+def test_metrics_match_networkx():
+    for seed in range(5):
+        G = _network(seed)
+        net = dsit.network_arrays(G)
+        values = np.random.RandomState(seed).randint(2, size=len(G)).tolist()
+        assert opinion_metrics.meanSimilarityCoefficient(net, values) == pytest.approx(_similarity(G, values))
+        assert sorted(opinion_metrics.muthukrishnaClumpiness(net, values).tolist()) == _clumps(G, values)
+
+
+def test_similarity_trajectory_matches_recomputing():
+    G = _network(1)
+    net = dsit.network_arrays(G)
+    values = np.random.RandomState(0).randint(2, size=len(G)).tolist()
+    log = FlipLog(values)
+    dsit.run_dsit(net, values, net.conformity.tolist(), dsit.linear_rule, None, np.random.RandomState(1), None,
+                  None, log)
+    steps, similarity = opinion_metrics.similarity_trajectory(net, log)
+    for step, value in list(zip(steps, similarity))[::7]:
+        assert value == pytest.approx(_similarity(G, log.state_at(step).tolist()))
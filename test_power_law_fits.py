@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import network_data
+
+
+def _draw(pmf, size, seed):
+    return np.random.RandomState(seed).choice(len(pmf), size=size, p=pmf)
+
+
+def test_power_law_recovers_exponent():
+    pmf = network_data.power_law_pmf(2.5, 3, 4999)
+    for seed in range(3):
+        alpha, x_min, ks = network_data.fit_power_law(_draw(pmf, 5000, seed), x_min=3)
+        assert x_min == 3 and alpha == pytest.approx(2.5, abs=0.1) and ks < 0.03
+
+
+def test_power_law_batch_matches_single_fits():
+    pmf = network_data.power_law_pmf(2.2, 2, 1999)
+    sequences = [_draw(pmf, 2000, seed) for seed in range(4)]
+    counts = np.array([network_data.degree_histogram(degrees, 1999)[0] for degrees in sequences])
+    alpha, x_min, ks = network_data.fit_power_law_histograms(counts)
+    for i, degrees in enumerate(sequences):
+        assert network_data.fit_power_law(degrees) == pytest.approx((alpha[i], x_min[i], ks[i]))
+
+
+def test_broken_power_law_recovers_exponents():
+    pmf = network_data.broken_power_law_pmf(1.8, 3.5, 20, 1, 19999)
+    alpha1, alpha2, switch, ks = network_data.fit_broken_power_law(_draw(pmf, 20000, 0))
+    assert alpha1 == pytest.approx(1.8, abs=0.1)
+    assert alpha2 == pytest.approx(3.5, abs=0.3)
+    assert 15 <= switch <= 25
+
+
+def test_support_defaults_to_n_minus_one():
+    degrees = _draw(network_data.power_law_pmf(2.5, 1, 999), 1000, 1)
+    counts, x_max = network_data.degree_histogram(degrees)
+    assert x_max == 999 and len(counts) == 1000
+    with pytest.raises(ValueError):
+        network_data.degree_histogram(degrees, int(degrees.max()) - 1)
+    # Truncating at the largest degree is a different, explicitly requested fit
+    assert network_data.fit_power_law(degrees, x_min=1) != network_data.fit_power_law(
+        degrees, x_min=1, x_max=int(degrees.max()))
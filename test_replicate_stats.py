@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from replicate_stats import P2Quantile, ReplicateAggregator, RunningStats
+
+
+def test_p2_follows_quantiles_of_long_streams():
+    rng = np.random.RandomState(0)
+    for values in (rng.normal(size=20000), rng.uniform(size=20000), rng.exponential(size=20000)):
+        for p in (0.05, 0.25, 0.5, 0.75, 0.95):
+            sketch = P2Quantile(p)
+            for x in values:
+                sketch.add(x)
+            exact = np.quantile(values, p)
+            spread = np.quantile(values, 0.75) - np.quantile(values, 0.25)
+            assert abs(sketch.value() - exact) < 0.03 * spread
+
+
+def test_p2_exact_on_short_streams():
+    sketch = P2Quantile(0.25)
+    assert np.isnan(sketch.value())
+    for x in (4.0, 1.0, 3.0):
+        sketch.add(x)
+    assert sketch.value() == np.quantile([4.0, 1.0, 3.0], 0.25)
+
+
+def test_running_stats_match_numpy():
+    values = np.random.RandomState(1).gamma(2.0, 3.0, size=5000)
+    stats = RunningStats()
+    for x in values:
+        stats.add(x)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance() == pytest.approx(values.var(ddof=1))
+
+
+def test_aggregator_stops_once_interval_narrow():
+    aggregator = ReplicateAggregator(target_width=0.1, min_replicates=5)
+    for i in range(4):
+        aggregator.add(0.5, 100)
+    # Too few replicates, however narrow the interval
+    assert not aggregator.done()
+    aggregator.add(0.5, 100)
+    assert aggregator.done()
+    assert not ReplicateAggregator().done()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from rng_streams import BlockStream
+
+
+def _draws(stream):
+    """A mix of scalar and bulk calls crossing block boundaries"""
+    values = [stream.random(), stream.randint(7), stream.choice('abcde')]
+    values.extend(stream.random_sample(50).tolist())
+    values.extend(stream.randint(3, 9, size=(4, 5)).ravel().tolist())
+    values.append(stream.random_sample())
+    values.extend(stream.random_sample(3).tolist())
+    return values
+
+
+def test_stream_follows_generator_uniforms():
+    uniforms = np.random.Generator(np.random.PCG64(np.random.SeedSequence(4))).random(30)
+    stream = BlockStream(4, block_size=7)
+    assert [stream.random() for i in range(5)] == uniforms[:5].tolist()
+    assert np.array_equal(stream.random_sample(20), uniforms[5:25])
+    assert stream.randint(10) == int(uniforms[25] * 10)
+    assert stream.position == 26
+
+
+def test_stream_independent_of_block_size():
+    expected = _draws(BlockStream(11))
+    for block_size in (1, 3, 16, 1000):
+        assert _draws(BlockStream(11, block_size=block_size)) == expected
+
+
+def test_replay_continues_from_position():
+    stream = BlockStream([5, 1], block_size=8)
+    _draws(stream)
+    position = stream.position
+    rest = _draws(stream)
+    assert _draws(stream.replay(position)) == rest
+    assert _draws(BlockStream([5, 1], block_size=64).replay(position)) == rest
@@ -0,0 +1,30 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import dsit_engine as dsit
+from graph_backend import set_column
+from shared_network import SharedNetwork
+
+
+def _network():
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(5, 6, True))
+    G.add_edges_from([(0, 13), (7, 22), (0, 29)])
+    set_column(G, 'extraversion', np.linspace(0, 1, len(G)))
+    set_column(G, 'conformity', np.linspace(1, 0, len(G)))
+    return G
+
+
+def test_from_graph_matches_network_arrays():
+    G = _network()
+    expected = dsit.network_arrays(G)
+    with SharedNetwork.from_graph(G) as shared:
+        attached = SharedNetwork.attach(shared.handle).network()
+        for field in ('indptr', 'indices', 'extraversion', 'conformity'):
+            assert np.array_equal(getattr(attached, field), getattr(expected, field))
+        assert list(attached.nodes) == list(expected.nodes)
+
+
+def test_from_graph_rejects_other_labels():
+    with pytest.raises(ValueError):
+        SharedNetwork.from_graph(nx.grid_2d_graph(3, 3))